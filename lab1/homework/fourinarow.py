@@ -3,14 +3,24 @@
 
 
 
-import random, copy, sys, pygame
+import random, sys, time, math, threading, pygame
 from pygame.locals import *
 
 BOARDWIDTH = 7  # how many spaces wide the board is
 BOARDHEIGHT = 6 # how many spaces tall the board is
 assert BOARDWIDTH >= 4 and BOARDHEIGHT >= 4, 'Board must be at least 4x4.'
 
-DIFFICULTY = 2 # how many moves to look ahead. (>2 is usually too much)
+THINKTIME = 0.5 # seconds the computer thinks about each move (0.1 is easy, 2 is hard)
+
+WINSCORE = 10000 # score of a won position, less the number of tokens on the board
+THREATSCORE = 4 # score of each empty space that would complete four in a row
+ORDERDEPTH = 2 # moves are sorted by the threes they make only this many moves or more from the search horizon
+TABLESIZE = 262147 # entries in the transposition table (a prime, so keys spread over all of them)
+
+# kinds of scores kept in the transposition table
+EXACT = 'exact'
+LOWERBOUND = 'lower' # the real score is this or higher
+UPPERBOUND = 'upper' # the real score is this or lower
 
 SPACESIZE = 50 # size of the tokens and individual board spaces in pixels
 
@@ -87,6 +97,8 @@ def runGame(isFirstGame):
 
     # Set up a blank board data structure.
     mainBoard = getNewBoard()
+    # Positions searched during the last game won't come up again.
+    TRANSPOSITIONS.clear()
 
     while True: # main game loop
         if turn == HUMAN:
@@ -104,7 +116,7 @@ def runGame(isFirstGame):
             turn = COMPUTER # switch to other player's turn
         else:
             # Computer player's turn.
-            column = getComputerMove(mainBoard)
+            column = waitForComputerMove(mainBoard)
             animateComputerMoving(mainBoard, column)
             makeMove(mainBoard, BLACK, column)
             if isWinner(mainBoard, BLACK):
@@ -265,60 +277,239 @@ def animateComputerMoving(board, column):
     animateDroppingToken(board, column, BLACK)
 
 
-def getComputerMove(board):
-    potentialMoves = getPotentialMoves(board, BLACK, DIFFICULTY)
-    # get the best fitness from the potential moves
-    bestMoveFitness = -1
-    for i in range(BOARDWIDTH):
-        if potentialMoves[i] > bestMoveFitness and isValidMove(board, i):
-            bestMoveFitness = potentialMoves[i]
-    # find all potential moves that have this best fitness
-    bestMoves = []
-    for i in range(len(potentialMoves)):
-        if potentialMoves[i] == bestMoveFitness and isValidMove(board, i):
-            bestMoves.append(i)
-    return random.choice(bestMoves)
-
+def waitForComputerMove(board):
+    # Let the computer think in a background thread while the window keeps
+    # updating, with the black token hovering over its pile. Closing the
+    # window stops the search.
+    thinker = ComputerThinker(board)
+    # The label never changes, so load the font and render it only once.
+    font = pygame.font.Font(None, 60)
+    text = font.render('Thinking...', True, WHITE)
+    text_rect = text.get_rect()
+    text_rect.center = (WINDOWWIDTH // 2, 30)
+    while not thinker.done():
+        for event in pygame.event.get(): # event handling loop
+            if event.type == QUIT:
+                thinker.cancel()
+                pygame.quit()
+                sys.exit()
+        hover = int(math.sin(pygame.time.get_ticks() / 150) * 5)
+        drawBoard(board, {'x':BLACKPILERECT.left, 'y':BLACKPILERECT.top + hover, 'color':BLACK}, turn=COMPUTER)
+        DISPLAYSURF.blit(text, text_rect)
+        pygame.display.update()
+        # limit the frame rate, so drawing leaves the search most of the time
+        FPSCLOCK.tick(FPS)
+    return thinker.result()
+
+
+class ComputerThinker:
+    # Runs getComputerMove() in a daemon thread. done() tells if the move is
+    # ready, result() waits for it, and cancel() stops the search early
+    # (result() is then meaningless).
+    def __init__(self, board, thinkTime=THINKTIME):
+        self.board = [column[:] for column in board]
+        self.thinkTime = thinkTime
+        self.stop = threading.Event()
+        self.column = None
+        self.error = None
+        self.thread = threading.Thread(target=self.think, name='computer-player', daemon=True)
+        self.thread.start()
+
+    def think(self):
+        try:
+            self.column = getComputerMove(self.board, thinkTime=self.thinkTime, stop=self.stop)
+        except Exception as error:
+            self.error = error
+
+    def done(self):
+        return not self.thread.is_alive()
+
+    def cancel(self):
+        self.stop.set()
+        self.thread.join()
+
+    def result(self):
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.column
+
+
+def getComputerMove(board, table=None, thinkTime=THINKTIME, stop=None):
+    # Return the best column for BLACK. The search looks one move ahead,
+    # then two, and so on until thinkTime seconds are up or stop (a
+    # threading.Event) is set, and the best move of the deepest search that
+    # finished is played. Each search starts with the best moves of the
+    # previous one, kept in the transposition table (TRANSPOSITIONS unless
+    # another one is given), which is also kept for the next moves of the
+    # same game.
+    deadline = time.perf_counter() + thinkTime
+    if table is None:
+        table = TRANSPOSITIONS
+    if stop is None:
+        stop = threading.Event()
+    table.newSearch()
+    bitBoard = BitBoard.fromBoard(board, BLACK)
+    playable = bitBoard.playableSpaces()
+    threats = bitBoard.threats(bitBoard.turn)
+    opponentThreats = bitBoard.threats(bitBoard.turn ^ 1)
+    entry = table.get(bitBoard.key())
+    columns = getSearchMoves(bitBoard, ORDERDEPTH, playable, threats, opponentThreats, entry and entry[5])
+    if not columns:
+        # every move loses, or wins right away (getSearchMoves() returns no
+        # moves in both cases); the first playable column is then as good as
+        # any, except for a winning one
+        columns = [column for column in bitBoard.order if playable & bitBoard.columnMasks[column]]
+        for column in columns:
+            if threats & playable & bitBoard.columnMasks[column]:
+                return column
+        return columns[0]
+    if len(columns) == 1:
+        return columns[0]
+
+    bestColumn = columns[0]
+    for depth in range(1, bitBoard.width * bitBoard.height - bitBoard.count + 1):
+        try:
+            # the first search always finishes, so there is a move to play
+            score, bestColumn = searchRoot(bitBoard, depth, columns, table, deadline if depth > 1 else float('inf'), stop)
+        except SearchTimeout:
+            # the unfinished search leaves its moves on bitBoard, which isn't
+            # used any more
+            break
+        if abs(score) > WINSCORE // 2:
+            break # a win or a loss was found, searching deeper won't change it
+        columns.remove(bestColumn)
+        columns.insert(0, bestColumn)
+    return bestColumn
+
+
+def searchRoot(bitBoard, depth, columns, table, deadline, stop):
+    # Search the given columns depth moves deep and return the best score
+    # and column.
+    bestColumn = columns[0]
+    alpha = -WINSCORE - 1
+    for column in columns:
+        bitBoard.makeMove(column)
+        score = -negamax(bitBoard, depth - 1, -WINSCORE - 1, -alpha, table, deadline, stop)
+        bitBoard.unmakeMove()
+        if score > alpha:
+            alpha = score
+            bestColumn = column
+    table.put(bitBoard.key(), depth, EXACT, alpha, bestColumn)
+    return alpha, bestColumn
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def getSearchMoves(bitBoard, depth, playable, threats, opponentThreats, bestGuess=None):
+    # The columns worth searching for the side to move, best guesses first
+    # (bestGuess, usually the best move found by an earlier search, goes
+    # first of all). Returns an empty list when the side to move can win
+    # right away or will lose whatever it plays.
+    if threats & playable:
+        return []
+    forced = playable & opponentThreats
+    if forced:
+        if forced & (forced - 1):
+            # the opponent can win in two places and only one can be blocked
+            return []
+        moves = forced
+    else:
+        moves = playable
+    # never play directly below a space where the opponent would win
+    moves &= ~(opponentThreats >> 1)
+
+    columns = [column for column in bitBoard.order if moves & bitBoard.columnMasks[column]]
+    if depth >= ORDERDEPTH and len(columns) > 1:
+        # try first the moves that make the most open threes (sort() is
+        # stable, so ties stay centre-first)
+        player = bitBoard.turn
+        created = {}
+        for column in columns:
+            bitBoard.makeMove(column)
+            created[column] = bin(bitBoard.threats(player)).count('1')
+            bitBoard.unmakeMove()
+        columns.sort(key=created.get, reverse=True)
+    if bestGuess in columns:
+        columns.remove(bestGuess)
+        columns.insert(0, bestGuess)
+    return columns
+
+
+def negamax(bitBoard, depth, alpha, beta, table, deadline, stop):
+    # Score of the position for the side to move, searched depth moves
+    # ahead with alpha-beta pruning. Scores at or above beta only tell that
+    # the position is at least that good (the opponent will avoid it), and
+    # scores at or below alpha that it is at most that good. Raises
+    # SearchTimeout once time.perf_counter() passes the deadline or the stop
+    # event is set.
+    if bitBoard.isFull():
+        return 0 # a tie
+    playable = bitBoard.playableSpaces()
+    threats = bitBoard.threats(bitBoard.turn)
+    if threats & playable:
+        # win right away; sooner wins score higher
+        return WINSCORE - bitBoard.count - 1
+    opponentThreats = bitBoard.threats(bitBoard.turn ^ 1)
+
+    # a position searched before, maybe reached by other moves or in an
+    # earlier turn, either settles the score or tells which move to try first
+    key = bitBoard.key()
+    entry = table.get(key)
+    bestGuess = None
+    if entry is not None:
+        entryKey, entryAge, entryDepth, kind, score, bestGuess = entry
+        if entryDepth >= depth:
+            if kind == EXACT:
+                return score
+            if kind == LOWERBOUND and score >= beta:
+                return score
+            if kind == UPPERBOUND and score <= alpha:
+                return score
+
+    columns = getSearchMoves(bitBoard, depth, playable, threats, opponentThreats, bestGuess)
+    if not columns:
+        # the opponent wins with their next move
+        return -(WINSCORE - bitBoard.count - 2)
+    if depth == 0:
+        return evaluate(bitBoard, threats, opponentThreats)
+    if time.perf_counter() > deadline or stop.is_set():
+        raise SearchTimeout()
+
+    originalAlpha = alpha
+    bestScore = -WINSCORE - 1
+    for column in columns:
+        bitBoard.makeMove(column)
+        score = -negamax(bitBoard, depth - 1, -beta, -alpha, table, deadline, stop)
+        bitBoard.unmakeMove()
+        if score > bestScore:
+            bestScore = score
+            bestColumn = column
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+
+    if bestScore <= originalAlpha:
+        kind = UPPERBOUND
+    elif bestScore >= beta:
+        kind = LOWERBOUND
+    else:
+        kind = EXACT
+    table.put(key, depth, kind, bestScore, bestColumn)
+    return bestScore
 
-def getPotentialMoves(board, tile, lookAhead):
-    if lookAhead == 0 or isBoardFull(board):
-        return [0] * BOARDWIDTH
 
-    if tile == RED:
-        enemyTile = BLACK
-    else:
-        enemyTile = RED
-
-    # Figure out the best move to make.
-    potentialMoves = [0] * BOARDWIDTH
-    for firstMove in range(BOARDWIDTH):
-        dupeBoard = copy.deepcopy(board)
-        if not isValidMove(dupeBoard, firstMove):
-            continue
-        makeMove(dupeBoard, tile, firstMove)
-        if isWinner(dupeBoard, tile):
-            # a winning move automatically gets a perfect fitness
-            potentialMoves[firstMove] = 1
-            break # don't bother calculating other moves
-        else:
-            # do other player's counter moves and determine best one
-            if isBoardFull(dupeBoard):
-                potentialMoves[firstMove] = 0
-            else:
-                for counterMove in range(BOARDWIDTH):
-                    dupeBoard2 = copy.deepcopy(dupeBoard)
-                    if not isValidMove(dupeBoard2, counterMove):
-                        continue
-                    makeMove(dupeBoard2, enemyTile, counterMove)
-                    if isWinner(dupeBoard2, enemyTile):
-                        # a losing move automatically gets the worst fitness
-                        potentialMoves[firstMove] = -1
-                        break
-                    else:
-                        # do the recursive call to getPotentialMoves()
-                        results = getPotentialMoves(dupeBoard2, tile, lookAhead - 1)
-                        potentialMoves[firstMove] += (sum(results) / BOARDWIDTH) / BOARDWIDTH
-    return potentialMoves
+def evaluate(bitBoard, threats, opponentThreats):
+    # Heuristic score of a position for the side to move: open threes (empty
+    # spaces that would complete four, from BitBoard.threats()) of each
+    # player, and tokens in the centre column, which is part of the most lines.
+    score = THREATSCORE * (bin(threats).count('1') - bin(opponentThreats).count('1'))
+    centre = bitBoard.centreMask
+    score += bin(bitBoard.bitboards[bitBoard.turn] & centre).count('1') - bin(bitBoard.bitboards[bitBoard.turn ^ 1] & centre).count('1')
+    return score
 
 
 def getLowestEmptySpace(board, column):
@@ -369,5 +560,173 @@ def isWinner(board, tile):
                 return True
     return False
 
+
+# Bitboard engine used by the computer player's search.
+#
+# Each player's tokens are one int with a bit per space. Column x uses
+# bits x*(BOARDHEIGHT+1) to x*(BOARDHEIGHT+1)+BOARDHEIGHT-1 from the bottom
+# up, and the bit above the top space is always 0 so that shifted lines
+# never wrap from one column into the next. A 7x6 board fits in 49 bits.
+# Python ints have no fixed width, so bigger boards work the same way.
+#
+# Note that bit rows count from the bottom while the list board's y counts
+# from the top: list space (x, y) is bit x*(BOARDHEIGHT+1) + BOARDHEIGHT-1-y.
+
+TILES = (RED, BLACK) # player index -> tile
+
+class BitBoard:
+    def __init__(self, width=BOARDWIDTH, height=BOARDHEIGHT):
+        self.width = width
+        self.height = height
+        self.bitboards = [0, 0] # tokens of RED and BLACK
+        # heights[x] is the bit index of the lowest empty space in column x
+        self.heights = [x * (height + 1) for x in range(width)]
+        self.turn = TILES.index(BLACK) # player index of the side to move
+        self.moves = [] # columns played since the board was set up, for unmakeMove()
+        self.count = 0 # tokens on the board
+        # bit shifts to the next space vertically, along the \ diagonal,
+        # horizontally and along the / diagonal
+        self.directions = (1, height, height + 1, height + 2)
+        self.bottomMask = sum(1 << (x * (height + 1)) for x in range(width)) # lowest space of each column
+        self.boardMask = self.bottomMask * ((1 << height) - 1) # every space on the board
+        # columns ordered from the centre out; central columns take part in
+        # more lines, so searching them first gives more alpha-beta cutoffs
+        self.order = sorted(range(width), key=lambda x: abs(2 * x - (width - 1)))
+        self.columnMasks = [((1 << height) - 1) << (x * (height + 1)) for x in range(width)]
+        self.centreMask = self.columnMasks[width // 2]
+
+    @classmethod
+    def fromBoard(cls, board, turn=BLACK):
+        # Build a bitboard from the list board used by the GUI, with turn
+        # being the tile that moves next.
+        bitBoard = cls(len(board), len(board[0]))
+        for x, column in enumerate(board):
+            for y in range(bitBoard.height - 1, -1, -1):
+                if column[y] == EMPTY:
+                    break
+                bitBoard.bitboards[TILES.index(column[y])] |= 1 << bitBoard.heights[x]
+                bitBoard.heights[x] += 1
+                bitBoard.count += 1
+        bitBoard.turn = TILES.index(turn)
+        return bitBoard
+
+    def toBoard(self):
+        # Convert back to the list board used by the GUI.
+        board = [[EMPTY] * self.height for x in range(self.width)]
+        for x in range(self.width):
+            for y in range(self.height):
+                bit = 1 << (x * (self.height + 1) + self.height - 1 - y)
+                if self.bitboards[0] & bit:
+                    board[x][y] = TILES[0]
+                elif self.bitboards[1] & bit:
+                    board[x][y] = TILES[1]
+        return board
+
+    def isValidMove(self, column):
+        # Returns True if the column is on the board and not full.
+        return 0 <= column < self.width and self.heights[column] < column * (self.height + 1) + self.height
+
+    def makeMove(self, column):
+        # Drop a token of the side to move into the column. The column must
+        # not be full.
+        self.bitboards[self.turn] |= 1 << self.heights[column]
+        self.heights[column] += 1
+        self.moves.append(column)
+        self.count += 1
+        self.turn ^= 1
+
+    def unmakeMove(self):
+        # Take back the last makeMove().
+        column = self.moves.pop()
+        self.turn ^= 1
+        self.count -= 1
+        self.heights[column] -= 1
+        self.bitboards[self.turn] ^= 1 << self.heights[column]
+
+    def hasFour(self, bits):
+        # True if the bits contain four in a row in any direction: after
+        # bits & (bits >> shift) each bit marks two in a row, and doing it
+        # again with twice the shift marks four.
+        for shift in self.directions:
+            pairs = bits & (bits >> shift)
+            if pairs & (pairs >> (2 * shift)):
+                return True
+        return False
+
+    def isWinner(self, tile):
+        return self.hasFour(self.bitboards[TILES.index(tile)])
+
+    def lastMoveWon(self):
+        # True if the player who just moved has connected four.
+        return self.hasFour(self.bitboards[self.turn ^ 1])
+
+    def isFull(self):
+        return self.count == self.width * self.height
+
+    def playableSpaces(self):
+        # Bits of the lowest empty space of every column that is not full.
+        # Adding the bottom row carries each column's lowest bit up past its
+        # tokens to the first empty space.
+        return ((self.bitboards[0] | self.bitboards[1]) + self.bottomMask) & self.boardMask
+
+    def threats(self, player):
+        # Bits of the empty spaces that would give the player four in a row,
+        # i.e. the open ends of their threes (also threes with a gap).
+        bits = self.bitboards[player]
+        # vertically only the space on top of three can be empty
+        spaces = (bits << 1) & (bits << 2) & (bits << 3)
+        for shift in self.directions[1:]:
+            # spaces with two tokens on one side and a third token either
+            # further along that side or just past the space on the other
+            after = bits << shift
+            before = bits >> shift
+            pairs = after & (after << shift)
+            spaces |= pairs & ((pairs << shift) | before)
+            pairs = before & (before >> shift)
+            spaces |= pairs & ((pairs >> shift) | after)
+        return spaces & (self.boardMask ^ (self.bitboards[0] | self.bitboards[1]))
+
+    def key(self):
+        # A number that tells the position apart from all others, as seen by
+        # the side to move: the occupied spaces plus the bottom row leave one
+        # bit just above the top token of each column, and the tokens of the
+        # side to move lie below it.
+        return self.bitboards[self.turn] + (self.bitboards[0] | self.bitboards[1]) + self.bottomMask
+
+
+class TranspositionTable:
+    # Fixed-size table of searched positions, indexed by BitBoard.key().
+    # Each entry is (key, age, depth, kind, score, column): the score of a
+    # search depth moves deep (EXACT, LOWERBOUND or UPPERBOUND) and the best
+    # column found. A position whose key lands on a taken slot replaces the
+    # entry there if it was searched at least as deep, or if the entry is from
+    # an earlier search (age counts searches, see newSearch()).
+    def __init__(self, size=TABLESIZE):
+        self.size = size
+        self.clear()
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.age = 0
+
+    def newSearch(self):
+        self.age += 1
+
+    def get(self, key):
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def put(self, key, depth, kind, score, column):
+        index = key % self.size
+        entry = self.entries[index]
+        if entry is None or entry[1] != self.age or entry[2] <= depth:
+            self.entries[index] = (key, self.age, depth, kind, score, column)
+
+
+TRANSPOSITIONS = TranspositionTable() # kept from move to move, cleared for each game
+
+
 if __name__ == '__main__':
     main()
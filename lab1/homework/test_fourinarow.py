@@ -0,0 +1,128 @@
+# Tests for the Four in a Row bitboard engine, checked against the list
+# board functions the game started with. Run with: python -m pytest
+import copy, random, threading
+
+import pytest
+
+from fourinarow import *
+
+
+def randomGames(count, seed):
+    # Yield (board, bitBoard, tile) after every move of random games, with
+    # tile being the one that moves next. Games stop at four in a row or a
+    # full board.
+    rand = random.Random(seed)
+    for game in range(count):
+        board = getNewBoard()
+        bitBoard = BitBoard()
+        tile = BLACK
+        while True:
+            yield board, bitBoard, tile
+            if isWinner(board, RED) or isWinner(board, BLACK) or isBoardFull(board):
+                break
+            column = rand.choice([x for x in range(BOARDWIDTH) if isValidMove(board, x)])
+            makeMove(board, tile, column)
+            bitBoard.makeMove(column)
+            tile = RED if tile == BLACK else BLACK
+
+
+def hasForcedWin(board, tile, plies):
+    # True if tile can connect four within the given number of its own and
+    # the opponent's moves (odd, the last one is tile's), whatever the
+    # opponent plays.
+    opponent = RED if tile == BLACK else BLACK
+    for column in range(BOARDWIDTH):
+        if not isValidMove(board, column):
+            continue
+        afterMove = copy.deepcopy(board)
+        makeMove(afterMove, tile, column)
+        if isWinner(afterMove, tile):
+            return True
+        if plies < 3 or isBoardFull(afterMove):
+            continue
+        for reply in range(BOARDWIDTH):
+            if not isValidMove(afterMove, reply):
+                continue
+            afterReply = copy.deepcopy(afterMove)
+            makeMove(afterReply, opponent, reply)
+            if isWinner(afterReply, opponent) or not hasForcedWin(afterReply, tile, plies - 2):
+                break
+        else:
+            return True
+    return False
+
+
+def test_winner_matches_list_board():
+    for board, bitBoard, tile in randomGames(200, 1):
+        for player in (RED, BLACK):
+            assert bitBoard.isWinner(player) == isWinner(board, player)
+        assert bitBoard.isFull() == isBoardFull(board)
+        if bitBoard.moves:
+            # the player who just moved is the other one
+            lastTile = RED if tile == BLACK else BLACK
+            assert bitBoard.lastMoveWon() == isWinner(board, lastTile)
+
+
+def test_board_conversion():
+    for board, bitBoard, tile in randomGames(50, 2):
+        assert bitBoard.toBoard() == board
+        converted = BitBoard.fromBoard(board, tile)
+        assert converted.bitboards == bitBoard.bitboards
+        assert converted.heights == bitBoard.heights
+        assert converted.key() == bitBoard.key()
+
+
+def test_playable_spaces_and_threats():
+    for board, bitBoard, tile in randomGames(50, 3):
+        playable = bitBoard.playableSpaces()
+        for x in range(BOARDWIDTH):
+            y = getLowestEmptySpace(board, x)
+            bit = 1 << (x * (BOARDHEIGHT + 1) + BOARDHEIGHT - 1 - y)
+            assert bool(playable & bit) == (y != -1)
+        # a threat is an empty space, anywhere up the column, that would
+        # complete four in a row
+        for player, threatTile in enumerate(TILES):
+            if isWinner(board, threatTile):
+                continue # any space would "complete" the four that is already there
+            threats = bitBoard.threats(player)
+            for x in range(BOARDWIDTH):
+                for y in range(BOARDHEIGHT):
+                    bit = 1 << (x * (BOARDHEIGHT + 1) + BOARDHEIGHT - 1 - y)
+                    if board[x][y] != EMPTY:
+                        assert not threats & bit
+                        continue
+                    board[x][y] = threatTile
+                    completesFour = isWinner(board, threatTile)
+                    board[x][y] = EMPTY
+                    assert bool(threats & bit) == completesFour
+
+
+def test_unmake_move_restores_board():
+    rand = random.Random(4)
+    bitBoard = BitBoard()
+    history = []
+    for i in range(500):
+        if bitBoard.moves and (bitBoard.isFull() or rand.random() < 0.4):
+            bitBoard.unmakeMove()
+            assert (bitBoard.bitboards, bitBoard.heights, bitBoard.turn) == history.pop()
+            continue
+        history.append((bitBoard.bitboards[:], bitBoard.heights[:], bitBoard.turn))
+        bitBoard.makeMove(rand.choice([x for x in range(BOARDWIDTH) if bitBoard.isValidMove(x)]))
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_negamax_finds_forced_wins(seed):
+    # The win negamax reports is a real forced win, found in the fewest
+    # moves, and every win within three moves is found.
+    for board, bitBoard, tile in randomGames(8, seed):
+        if isWinner(board, RED) or isWinner(board, BLACK) or isBoardFull(board):
+            continue
+        position = BitBoard.fromBoard(board, tile)
+        score = negamax(position, 2, -WINSCORE - 1, WINSCORE + 1, TranspositionTable(1009), float('inf'), threading.Event())
+        assert position.bitboards == bitBoard.bitboards
+        if score > WINSCORE // 2:
+            plies = WINSCORE - score - position.count
+            assert hasForcedWin(board, tile, plies)
+            assert plies == 1 or not hasForcedWin(board, tile, plies - 2)
+        else:
+            assert not hasForcedWin(board, tile, 3)
@@ -0,0 +1,123 @@
+#analiza wielu rozdan naraz - kazde ziarno (jak w Deck.shuffle(seed)) trafia do solvera
+#w puli procesow, wyniki laduja w zwartym pliku indeksu (11 bajtow na rozdanie)
+#przyklad: python analyze_deals.py 1000000 --workers 8 --output deals.idx
+import argparse
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from collections import Counter
+
+from klondike import shuffled_order
+from solver import solve_order
+
+INDEX_MAGIC = b'SDIX'
+INDEX_VERSION = 1
+#ziarno, wynik, dlugosc rozwiazania, liczba przeszukanych wezlow
+RECORD = struct.Struct('<IBHI')
+
+STATUS_CODES = {'unsolvable': 0, 'solvable': 1, 'unknown': 2}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+#domyslny budzet solvera na rozdanie: ok. 30 rozdan/s na rdzen, czyli milion ziaren w jedna noc,
+#kosztem ok. polowy rozdan 'unknown' (50 000 wezlow to ok. 2 rozdania/s i 33% 'unknown');
+#domyslnie bez limitu czasu - wynik zalezy wtedy tylko od ziarna i budzetu wezlow, a nie od
+#obciazenia maszyny czy liczby procesow
+MAX_NODES = 2_000
+
+#progi liczby wezlow dla poziomow trudnosci rozwiazywalnych rozdan (dobrane do MAX_NODES);
+#wezly to wszystkie ruchy wykonane przez solver razem z cofnietymi, ale wiekszosc rozdan solver
+#rozwiazuje bez nawrotow i wtedy liczba wezlow to po prostu dlugosc rozwiazania - progi dziela
+#wiec rozdania glownie wedlug dlugosci rozwiazania, a dopiero powyzej niej wedlug nawrotow
+BUCKETS = (
+    ('easy', 250),
+    ('medium', 400),
+    ('hard', None),
+)
+
+#ustawienia solvera dla procesu roboczego (ustawiane przez _init_worker)
+_solve_kwargs = {}
+
+
+def _init_worker(max_nodes, time_limit):
+    _solve_kwargs['max_nodes'] = max_nodes
+    _solve_kwargs['time_limit'] = time_limit
+
+def analyze_seed(seed):
+    result = solve_order(shuffled_order(seed), **_solve_kwargs)
+    return seed, STATUS_CODES[result.status], min(len(result.moves), 0xFFFF), result.nodes
+
+def difficulty_bucket(status, nodes):
+    if status != STATUS_CODES['solvable']:
+        return STATUS_NAMES[status]
+    for name, limit in BUCKETS:
+        if limit is None or nodes < limit:
+            return name
+
+def read_index(path):
+    #odczyt rekordow (ziarno, wynik, dlugosc rozwiazania, wezly) z pliku indeksu
+    with open(path, 'rb') as f:
+        header = f.read(len(INDEX_MAGIC) + 1)
+        if header[:len(INDEX_MAGIC)] != INDEX_MAGIC or header[-1] != INDEX_VERSION:
+            raise ValueError(f"{path} is not a deal index")
+        data = f.read()
+    usable = len(data) - len(data) % RECORD.size
+    return list(RECORD.iter_unpack(data[:usable]))
+
+def seeds_in_bucket(path, bucket):
+    return [seed for seed, status, length, nodes in read_index(path) if difficulty_bucket(status, nodes) == bucket]
+
+def analyze(start, count, output, workers=None, max_nodes=MAX_NODES, time_limit=None, chunksize=64,
+            progress=True):
+    workers = workers or os.cpu_count()
+    seeds = range(start, start + count)
+    done = 0
+    began = time.perf_counter()
+    with open(output, 'wb') as f, multiprocessing.Pool(workers, _init_worker, (max_nodes, time_limit)) as pool:
+        f.write(INDEX_MAGIC + bytes([INDEX_VERSION]))
+        buffer = bytearray()
+        for record in pool.imap_unordered(analyze_seed, seeds, chunksize):
+            buffer += RECORD.pack(*record)
+            done += 1
+            if len(buffer) >= RECORD.size * 4096:
+                f.write(buffer)
+                buffer.clear()
+                if progress:
+                    rate = done / (time.perf_counter() - began)
+                    print(f"\r{done}/{count} deals, {rate:.0f} deals/s", end='', file=sys.stderr)
+        f.write(buffer)
+    elapsed = time.perf_counter() - began
+    if progress:
+        print(f"\r{done}/{count} deals in {elapsed:.1f} s ({done / elapsed:.0f} deals/s, {workers} workers)",
+              file=sys.stderr)
+    return elapsed
+
+def summarize(path):
+    buckets = Counter(difficulty_bucket(status, nodes) for seed, status, length, nodes in read_index(path))
+    total = sum(buckets.values())
+    for name in [name for name, _ in BUCKETS] + ['unsolvable', 'unknown']:
+        share = 100 * buckets[name] / total if total else 0
+        print(f"{name:>10}: {buckets[name]:>9} ({share:.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rate solitaire deals by solver difficulty.",
+        epilog="The node budget trades rate for coverage: deals the solver cannot finish within it are "
+               "stored as 'unknown'. The default runs about 30 deals/s per core with about half unknown; "
+               "--max-nodes 50000 leaves about 33% unknown but runs about 2 deals/s per core. "
+               "--time-limit caps slow deals too, but then the index depends on machine load.")
+    parser.add_argument('count', type=int, help="number of seeds to analyze")
+    parser.add_argument('--start', type=int, default=0, help="first seed")
+    parser.add_argument('--output', default='deals.idx', help="index file to write")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--max-nodes', type=int, default=MAX_NODES,
+                        help=f"solver node budget per deal (default: {MAX_NODES})")
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help="solver time budget per deal in seconds (default: none, results are reproducible)")
+    parser.add_argument('--chunksize', type=int, default=64, help="seeds sent to a worker at once")
+    args = parser.parse_args()
+    analyze(args.start, args.count, args.output, args.workers, args.max_nodes, args.time_limit,
+            args.chunksize)
+    summarize(args.output)
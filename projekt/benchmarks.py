@@ -0,0 +1,264 @@
+#testy wydajnosci najczesciej uzywanych sciezek solitaire.py, bez okna (SDL_VIDEODRIVER=dummy)
+#wynik jako JSON: operacje na sekunde i szczytowe zuzycie pamieci (tracemalloc) dla kazdego testu;
+#z --baseline porownuje wynik z wczesniejszym zapisem i konczy sie kodem 1 przy spadku wydajnosci
+#przyklad: python benchmarks.py --output bench.json
+#          python benchmarks.py --baseline bench.json --tolerance 0.2
+#tracemalloc widzi tylko pamiec Pythona - piksele powierzchni pygame nie sa wliczane
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import AbstractContextManager, ExitStack, contextmanager
+
+import pygame
+
+import solitaire
+from klondike import KlondikeState, plan_auto_finish
+from replay import random_replay
+from savegame import SavedGame, load_game, save_game
+from solver import solve
+
+RESOLUTIONS = ((1280, 720), (1920, 1080), (2560, 1440))
+MEMORY_OPS = 50  #liczba operacji mierzonych pod tracemalloc
+
+
+def deal_board(seed, decks=1):
+    deck = solitaire.Deck(decks)
+    deck.shuffle(seed)
+    game_board = solitaire.GameBoard(decks)
+    game_board.deal_initial_cards(deck)
+    return game_board
+
+@contextmanager
+def resolution(width, height, decks=1):
+    #tymczasowe przestawienie wymiarow planszy i kart solitaire.py na inna rozdzielczosc i liczbe talii
+    saved = solitaire.WINDOW_WIDTH, solitaire.WINDOW_HEIGHT, solitaire.layout.foundation_count // 4
+    solitaire.set_geometry(width, height, decks)
+    try:
+        yield
+    finally:
+        solitaire.set_geometry(*saved)
+
+def near_finished_board(seed=0):
+    #plansza z odkrytymi wszystkimi kartami stosow glownych - stan, w ktorym pojawia sie auto-finish
+    game_board = deal_board(seed)
+    state = KlondikeState.from_serialized(solitaire.serialize_game_board(game_board, [], None))
+    result = solve(state.copy())
+    if result.status != 'solvable':
+        raise ValueError(f"seed {seed} is not solvable")
+    undo_log = solitaire.UndoLog()
+    for move in result.moves:
+        if solitaire.all_tableau_face_up(game_board):
+            break
+        solitaire.apply_engine_move(game_board, move, undo_log)
+    return solitaire.serialize_game_board(game_board, [], None)
+
+
+#kazdy test to funkcja przygotowujaca, ktora zwraca funkcje wykonujaca jedna operacje;
+#funkcja przygotowujaca moze przestawic rozdzielczosc (set_geometry) - measure() przywraca ja po tescie,
+#wiec mierzone operacje nie placa za przelaczanie wymiarow
+
+def bench_deal(decks=1):
+    def setup():
+        seeds = iter(range(1 << 30))
+        solitaire.set_geometry(solitaire.WINDOW_WIDTH, solitaire.WINDOW_HEIGHT, decks)
+        solitaire.get_card_atlas()
+        def op():
+            deal_board(next(seeds), decks)
+        return op
+    return setup
+
+def bench_serialize():
+    game_board = deal_board(0)
+    def op():
+        data = solitaire.serialize_game_board(game_board, [], None)
+        solitaire.deserialize_game_board(data)
+    return op
+
+def bench_draw(width, height, decks=1):
+    def setup():
+        surface = pygame.Surface((width, height)).convert()
+        solitaire.set_geometry(width, height, decks)
+        background = solitaire.get_background()
+        game_board = deal_board(0, decks)
+        def op():
+            surface.blit(background, (0, 0))
+            game_board.draw(surface)
+        return op
+    return setup
+
+def bench_draw_partial(decks):
+    #odswiezenie fragmentu ekranu z jednym stosem glownym (jak w DirtyRenderer) - koszt nie powinien
+    #rosnac z liczba kart na planszy
+    def setup():
+        width, height = RESOLUTIONS[1]
+        surface = pygame.Surface((width, height)).convert()
+        solitaire.set_geometry(width, height, decks)
+        background = solitaire.get_background()
+        game_board = deal_board(0, decks)
+        rect = solitaire.layout.tableau_rect(3, len(game_board.tableau_piles[3]))
+        def op():
+            surface.set_clip(rect)
+            surface.blit(background, rect, rect)
+            game_board.draw(surface)
+            surface.set_clip(None)
+        return op
+    return setup
+
+def bench_autofinish():
+    data = near_finished_board()
+    def op():
+        game_board, _, _ = solitaire.deserialize_game_board(data)
+        state = KlondikeState.from_serialized(data)
+        undo_log = solitaire.UndoLog()
+        for move in plan_auto_finish(state):
+            solitaire.apply_engine_move(game_board, move, undo_log)
+        if not solitaire.is_game_won(game_board):
+            raise AssertionError("auto-finish did not win the game")
+    return op
+
+@contextmanager
+def bench_autosave():
+    #zapis gry po ruchu (plansza + 300 ruchow przebiegu) i wczytanie z odbudowa planszy;
+    #katalog tymczasowy z zapisem jest usuwany po pomiarze
+    game_board = deal_board(0)
+    history = random_replay(0, random.Random(0)).moves
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'autosave.sav')
+        def op():
+            save_game(path, SavedGame(solitaire.compact_game_board(game_board), 'medium', 1, 1, 0, 0, history))
+            solitaire.game_board_from_compact(load_game(path).board)
+        yield op
+
+def measure_startup(runs=5):
+    #czas do pierwszej klatki menu i do wczytania zasobow w swiezym procesie (mediana z kilku uruchomien)
+    code = ('import json, solitaire; solitaire.init_display(); solitaire.start_asset_loading(); '
+            'solitaire.draw_menu(solitaire.screen, solitaire.get_font(36), solitaire.WINDOW_WIDTH, '
+            'solitaire.WINDOW_HEIGHT); solitaire.profiler.mark("first_frame"); solitaire.get_card_atlas(); '
+            'print(json.dumps(solitaire.profiler.marks))')
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)) or '.').stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    result = {}
+    for name in samples[0]:
+        values = sorted(sample[name] for sample in samples)
+        result[f'{name}_ms'] = round(values[len(values) // 2] * 1000, 2)
+    result['runs'] = runs
+    return result
+
+BENCHMARKS = {
+    'deal': bench_deal(),
+    'deal_two_decks': bench_deal(decks=2),
+    'serialize_roundtrip': bench_serialize,
+    'autofinish': bench_autofinish,
+    'autosave_roundtrip': bench_autosave,
+}
+for _width, _height in RESOLUTIONS:
+    BENCHMARKS[f'draw_{_width}x{_height}'] = bench_draw(_width, _height)
+BENCHMARKS['draw_two_decks_1920x1080'] = bench_draw(*RESOLUTIONS[1], decks=2)
+BENCHMARKS['draw_partial'] = bench_draw_partial(1)
+BENCHMARKS['draw_partial_two_decks'] = bench_draw_partial(2)
+BENCHMARKS['startup'] = measure_startup
+
+
+def measure(setup, seconds):
+    with resolution(solitaire.WINDOW_WIDTH, solitaire.WINDOW_HEIGHT, solitaire.layout.foundation_count // 4), \
+            ExitStack() as stack:
+        op = setup()
+        if isinstance(op, AbstractContextManager):
+            #test z zasobami do posprzatania (np. pliki tymczasowe) zwraca menedzer kontekstu
+            op = stack.enter_context(op)
+        op()  #rozgrzewka (bufory obrazow, czcionki)
+        ops = 0
+        start = time.perf_counter()
+        while True:
+            for _ in range(10):
+                op()
+            ops += 10
+            elapsed = time.perf_counter() - start
+            if elapsed >= seconds:
+                break
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        for _ in range(MEMORY_OPS):
+            op()
+        peak = tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+    return {'ops': ops, 'seconds': round(elapsed, 4), 'ops_per_sec': round(ops / elapsed, 1), 'peak_bytes': peak}
+
+def run(names, seconds):
+    results = {}
+    for name in names:
+        if name == 'startup':
+            results[name] = measure_startup()
+            print(f"{name:>24}: first frame {results[name]['first_frame_ms']:.1f} ms, "
+                  f"assets ready {results[name]['assets_ready_ms']:.1f} ms", file=sys.stderr)
+            continue
+        results[name] = measure(BENCHMARKS[name], seconds)
+        print(f"{name:>24}: {results[name]['ops_per_sec']:>12,.1f} ops/s, "
+              f"peak {results[name]['peak_bytes'] / 1024:,.1f} KiB", file=sys.stderr)
+    return {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'seconds_per_benchmark': seconds,
+        'results': results,
+    }
+
+def regressions(report, baseline, tolerance):
+    #testy wolniejsze od zapisu bazowego o wiecej niz tolerance (ulamek);
+    #dla czasu uruchamiania porownywany jest czas do pierwszej klatki
+    slower = []
+    for name, result in report['results'].items():
+        old = baseline['results'].get(name)
+        if not old:
+            continue
+        if 'ops_per_sec' in result:
+            if result['ops_per_sec'] < old['ops_per_sec'] * (1 - tolerance):
+                slower.append((name, f"{old['ops_per_sec']:,.1f} -> {result['ops_per_sec']:,.1f} ops/s"))
+        elif result['first_frame_ms'] > old['first_frame_ms'] * (1 + tolerance):
+            slower.append((name, f"{old['first_frame_ms']:.1f} -> {result['first_frame_ms']:.1f} ms to first frame"))
+    return slower
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark solitaire hot paths headlessly.")
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('--seconds', type=float, default=1.0, help="time spent on each benchmark")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    parser.add_argument('--baseline', help="JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+    solitaire.init_display()
+    report = run(args.names or list(BENCHMARKS), args.seconds)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(report, json.load(f), args.tolerance)
+        for name, change in slower:
+            print(f"regression: {name} {change}", file=sys.stderr)
+        if slower:
+            sys.exit(1)
@@ -0,0 +1,186 @@
+#przygotowanie obrazow kart w dokladnie takim rozmiarze, w jakim sa rysowane
+#karty sa rasteryzowane z plikow SVG (gdy dostepny jest cairosvg) albo skalowane wygladzajaco z PNG,
+#a wynik trafia do jednego pliku w assets/cache - kolejne uruchomienie w tej samej rozdzielczosci
+#wczytuje wszystkie karty jednym odczytem
+#przygotowanie obrazow nie wymaga okna, wiec moze dzialac w osobnym watku (AssetLoader);
+#konwersja do formatu ekranu odbywa sie potem w watku glownym
+#przyklad: python card_assets.py 154 215 (wygenerowanie pamieci podrecznej dla rozmiaru karty)
+import io
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import pygame
+
+from klondike import SUITS
+
+try:
+    import cairosvg
+except (ImportError, OSError):
+    #brak cairosvg lub biblioteki cairo - zostaja obrazy PNG
+    cairosvg = None
+
+ASSETS_DIR = 'assets'
+CACHE_DIR = os.path.join(ASSETS_DIR, 'cache')
+CACHE_MAGIC = b'SCAT'
+CACHE_VERSION = 1
+#naglowek pliku: znacznik, wersja, szerokosc i wysokosc karty, liczba obrazow
+HEADER = struct.Struct('<4sBHHH')
+
+#mapowanie wartosci kart na symbole
+VALUE_MAP = {
+    1: 'A',   #As
+    10: 'T',  #10
+    11: 'J',  #Walet
+    12: 'Q',  #Dama
+    13: 'K'   #Krol
+}
+
+#mapowanie kolorow kart na symbole
+SUIT_MAP = {
+    'hearts': 'H',    #Kiery
+    'diamonds': 'D',  #Karo
+    'clubs': 'C',     #Trefl
+    'spades': 'S'     #Pik
+}
+
+#kolejnosc obrazow w pliku: 52 karty w kolejnosci talii, na koncu tyl karty
+ATLAS_ORDER = [(suit, value) for suit in SUITS for value in range(1, 14)] + ['back']
+
+
+def card_name(suit, value):
+    return f'{VALUE_MAP.get(value, str(value))}{SUIT_MAP[suit]}'
+
+def cache_path(size):
+    source = 'svg' if cairosvg is not None else 'png'
+    return os.path.join(CACHE_DIR, f'cards_{size[0]}x{size[1]}_{source}.bin')
+
+def _scaled_png(path, size):
+    #bez convert_alpha (wymaga okna) - przejscie przez 32-bitowa powierzchnie z kanalem alfa,
+    #bo smoothscale nie obsluguje obrazow z paleta
+    image = pygame.image.load(path)
+    rgba = pygame.Surface(image.get_size(), pygame.SRCALPHA, 32)
+    rgba.blit(image, (0, 0))
+    return pygame.transform.smoothscale(rgba, size)
+
+def rasterize(key, size):
+    #obraz karty (albo tylu karty) w podanym rozmiarze
+    if key == 'back':
+        return _scaled_png(os.path.join(ASSETS_DIR, 'cardback.png'), size)
+    name = card_name(*key)
+    svg_path = os.path.join(ASSETS_DIR, 'cards', 'svg', f'{name}.svg')
+    if cairosvg is not None and os.path.exists(svg_path):
+        png = cairosvg.svg2png(url=svg_path, output_width=size[0], output_height=size[1])
+        return pygame.image.load(io.BytesIO(png), f'{name}.png')
+    return _scaled_png(os.path.join(ASSETS_DIR, 'cards', 'png', f'{name}.png'), size)
+
+def build_atlas(size):
+    #wszystkie obrazy jeden pod drugim na jednej powierzchni
+    width, height = size
+    atlas = pygame.Surface((width, height * len(ATLAS_ORDER)), pygame.SRCALPHA)
+    for i, key in enumerate(ATLAS_ORDER):
+        atlas.blit(rasterize(key, size), (0, i * height))
+    return atlas
+
+def save_atlas(atlas, size):
+    #zapis przez plik tymczasowy, zeby przerwany zapis nie zostawil uszkodzonego pliku
+    path = cache_path(size)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    header = HEADER.pack(CACHE_MAGIC, CACHE_VERSION, size[0], size[1], len(ATLAS_ORDER))
+    data = zlib.compress(pygame.image.tobytes(atlas, 'RGBA'), 1)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header + data)
+    os.replace(tmp_path, path)
+
+def read_atlas(size):
+    #wczytanie pliku z pamieci podrecznej albo None, gdy go nie ma lub nie pasuje
+    try:
+        with open(cache_path(size), 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    magic, version, width, height, count = HEADER.unpack_from(data)
+    if (magic, version, width, height, count) != (CACHE_MAGIC, CACHE_VERSION, size[0], size[1], len(ATLAS_ORDER)):
+        return None
+    try:
+        pixels = zlib.decompress(data[HEADER.size:])
+    except zlib.error:
+        return None
+    if len(pixels) != width * height * count * 4:
+        return None
+    return pygame.image.frombytes(pixels, (width, height * count), 'RGBA')
+
+def prepare_atlas(size):
+    #powierzchnia ze wszystkimi kartami z pamieci podrecznej albo zbudowana od nowa (bez okna)
+    atlas = read_atlas(size)
+    if atlas is None:
+        atlas = build_atlas(size)
+        try:
+            save_atlas(atlas, size)
+        except OSError:
+            #pamiec podreczna jest tylko przyspieszeniem - bez prawa zapisu karty i tak sa gotowe
+            pass
+    return atlas
+
+def slice_atlas(atlas, size):
+    #slownik (kolor, wartosc) -> obraz oraz 'back' -> tyl karty; obrazy sa wycinkami jednej powierzchni
+    atlas = atlas.convert_alpha()
+    width, height = size
+    return {key: atlas.subsurface((0, i * height, width, height)) for i, key in enumerate(ATLAS_ORDER)}
+
+def load_card_atlas(size):
+    return slice_atlas(prepare_atlas(size), size)
+
+def load_background(path, size):
+    return pygame.transform.scale(pygame.image.load(path), size)
+
+
+class AssetLoader:
+    #wczytanie tla i kart w watku w tle, zeby menu pojawilo sie od razu;
+    #result() czeka na koniec i konwertuje obrazy do formatu ekranu (musi byc wolane w watku glownym)
+    def __init__(self, background_path, window_size, card_size):
+        self.window_size = window_size
+        self.card_size = card_size
+        self.finished_at = None
+        self._background_path = background_path
+        self._background = None
+        self._atlas = None
+        self._error = None
+        self._result = None
+        self._thread = threading.Thread(target=self._load, name='asset-loader', daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        try:
+            self._background = load_background(self._background_path, self.window_size)
+            self._atlas = prepare_atlas(self.card_size)
+        except Exception as error:
+            self._error = error
+        self.finished_at = time.perf_counter()
+
+    def done(self):
+        return not self._thread.is_alive()
+
+    def result(self):
+        #(tlo, slownik kart) w formacie ekranu
+        if self._result is None:
+            self._thread.join()
+            if self._error is not None:
+                raise self._error
+            self._result = self._background.convert(), slice_atlas(self._atlas, self.card_size)
+            self._background = self._atlas = None
+        return self._result
+
+
+if __name__ == "__main__":
+    width, height = int(sys.argv[1]), int(sys.argv[2])
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    save_atlas(build_atlas((width, height)), (width, height))
+    print(cache_path((width, height)))
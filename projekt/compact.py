@@ -0,0 +1,137 @@
+#zwarta reprezentacja planszy - karta to jeden bajt, stos to bytearray
+#bajt karty: numer karty z klondike (0-51) + FACE_UP gdy karta jest odkryta
+#bajt stosu docelowego: kolor * 16 + liczba kart (0 = pusty)
+#cala plansza miesci sie w 65 bajtach: 7 dlugosci stosow glownych, 4 stosy docelowe,
+#2 dlugosci (dobieranie, odrzucone) i po bajcie na kazda karte spoza stosow docelowych
+#(przy dwoch taliach 9 stosow glownych i 8 docelowych - do 123 bajtow)
+from klondike import KlondikeState, SUIT_INDEX, TABLEAU_COUNT, card_id, card_suit_value
+
+FACE_UP = 0x80
+CARD_MASK = 0x7F
+
+
+def encode_card(card):
+    #karta z gry (obiekt z polami suit, value, face_up) na bajt
+    return card_id(card.suit, card.value) | (FACE_UP if card.face_up else 0)
+
+def decode_card(byte):
+    #bajt na krotke (kolor, wartosc, odkryta)
+    suit, value = card_suit_value(byte & CARD_MASK)
+    return suit, value, bool(byte & FACE_UP)
+
+
+class CompactBoard:
+    __slots__ = ('tableau', 'foundations', 'stock', 'waste')
+
+    def __init__(self, tableau, foundations, stock, waste):
+        self.tableau = tableau  #lista bytearray, po jednym na stos glowny
+        self.foundations = foundations  #bytearray(4) albo bytearray(8), bajt na stos docelowy
+        self.stock = stock
+        self.waste = waste
+
+    def copy(self):
+        return CompactBoard([bytearray(pile) for pile in self.tableau], bytearray(self.foundations),
+                            bytearray(self.stock), bytearray(self.waste))
+
+    def key(self):
+        #niezmienne bajty calej planszy - klucz do slownikow i zbiorow
+        out = bytearray()
+        for pile in self.tableau:
+            out.append(len(pile))
+            out += pile
+        out += self.foundations
+        out.append(len(self.stock))
+        out += self.stock
+        out.append(len(self.waste))
+        out += self.waste
+        return bytes(out)
+
+    def __eq__(self, other):
+        return isinstance(other, CompactBoard) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    @classmethod
+    def from_bytes(cls, data, tableau_count=7, foundation_count=4):
+        pos = 0
+        tableau = []
+        for _ in range(tableau_count):
+            size = data[pos]
+            tableau.append(bytearray(data[pos + 1:pos + 1 + size]))
+            pos += 1 + size
+        foundations = bytearray(data[pos:pos + foundation_count])
+        pos += foundation_count
+        size = data[pos]
+        stock = bytearray(data[pos + 1:pos + 1 + size])
+        pos += 1 + size
+        size = data[pos]
+        waste = bytearray(data[pos + 1:pos + 1 + size])
+        return cls(tableau, foundations, stock, waste)
+
+    @classmethod
+    def from_state(cls, state):
+        tableau = []
+        for pile, hidden in zip(state.tableau, state.hidden):
+            tableau.append(bytearray(card if k < hidden else card | FACE_UP for k, card in enumerate(pile)))
+        #w silniku stos docelowy i przyjmuje kolor i % 4
+        foundations = bytearray(f % 4 * 16 + count if count else 0 for f, count in enumerate(state.foundations))
+        stock = bytearray(state.stock)
+        waste = bytearray(card | FACE_UP for card in state.waste)
+        return cls(tableau, foundations, stock, waste)
+
+    def to_state(self, foundation_to_tableau=False, draw_count=1):
+        tableau = []
+        hidden = []
+        for pile in self.tableau:
+            tableau.append([byte & CARD_MASK for byte in pile])
+            hidden.append(sum(1 for byte in pile if not byte & FACE_UP))
+        #przy jednej talii stos planszy moze miec dowolny kolor, przy dwoch jego miejsce jest stale
+        foundations = [0] * len(self.foundations)
+        for i, byte in enumerate(self.foundations):
+            if byte & 15:
+                foundations[byte >> 4 if len(foundations) == 4 else i] = byte & 15
+        stock = [byte & CARD_MASK for byte in self.stock]
+        waste = [byte & CARD_MASK for byte in self.waste]
+        return KlondikeState(tableau, hidden, foundations, stock, waste, foundation_to_tableau, draw_count)
+
+    @classmethod
+    def from_game_board(cls, game_board):
+        #konwersja z GameBoard (karty jako obiekty Card)
+        tableau = [bytearray(encode_card(card) for card in pile) for pile in game_board.tableau_piles]
+        foundations = bytearray()
+        for pile in game_board.foundation_piles:
+            if pile:
+                foundations.append(SUIT_INDEX[pile[-1].suit] * 16 + len(pile))
+            else:
+                foundations.append(0)
+        stock = bytearray(encode_card(card) for card in game_board.stock_pile)
+        waste = bytearray(encode_card(card) for card in game_board.waste_pile)
+        return cls(tableau, foundations, stock, waste)
+
+    def foundation_piles(self):
+        #zawartosc stosow docelowych jako listy krotek (kolor, wartosc, odkryta)
+        piles = []
+        for byte in self.foundations:
+            suit, count = byte >> 4, byte & 15
+            piles.append([card_suit_value(suit * 13 + value)[:2] + (True,) for value in range(count)])
+        return piles
+
+    def to_serialized(self):
+        #ten sam format co serialize_game_board, do odbudowy obiektow Card
+        return {
+            'tableau_piles': [[decode_card(byte) for byte in pile] for pile in self.tableau],
+            'foundation_piles': self.foundation_piles(),
+            'stock_pile': [decode_card(byte) for byte in self.stock],
+            'waste_pile': [decode_card(byte) for byte in self.waste],
+            'picked_cards': [],
+            'picked_from': None
+        }
+
+
+def pack_state(state):
+    return CompactBoard.from_state(state).key()
+
+def unpack_state(data, foundation_to_tableau=False, draw_count=1, decks=1):
+    board = CompactBoard.from_bytes(data, TABLEAU_COUNT[decks], 4 * decks)
+    return board.to_state(foundation_to_tableau, draw_count)
@@ -0,0 +1,117 @@
+#podpowiedzi ruchow - plytkie przeszukiwanie z przyrostowym generatorem ruchow
+#generator pamieta dla kazdego stosu zrodlowego cele jego kart (pamiec celow z KlondikeState.legal_moves);
+#po ruchu przeliczane sa tylko stosy, ktorych ruch dotknal, a lista ruchow powstaje przez sprawdzenie
+#zapamietanych celow w slowniku wierzchnich kart
+#generator moze zyc obok stanu gry przez cala rozgrywke (apply/undo dla kazdego ruchu) - wtedy
+#podpowiedz (search_hint) nie buduje niczego od nowa
+import sys
+import time
+
+from klondike import (KlondikeState, WASTE, DRAW, RECYCLE, WASTE_TO_FOUNDATION, WASTE_TO_TABLEAU,
+                      TABLEAU_TO_TABLEAU, FOUNDATION_TO_TABLEAU, shuffled_order)
+
+HINT_DEPTH = 3  #liczba ruchow patrzenia w przod
+
+#wagi oceny stanu
+FOUNDATION_WEIGHT = 10  #karta na stosie docelowym
+HIDDEN_WEIGHT = 6  #zakryta karta w stosie glownym
+EMPTY_WEIGHT = 3  #pusty stos glowny
+RESERVE_WEIGHT = 1  #karta w stosie dobierania lub odrzuconych
+
+
+class MoveGenerator:
+    def __init__(self, state):
+        self.state = state
+        self._targets = {}  #zrodlo (stos glowny albo WASTE) -> cele kart, wypelniane przez state.legal_moves
+
+    def touched(self, move):
+        #uniewaznienie stosow zmienionych przez ruch - wywolywane po apply i po undo
+        kind, src, dst, count = move
+        targets = self._targets
+        if kind in (DRAW, RECYCLE, WASTE_TO_FOUNDATION):
+            targets.pop(WASTE, None)
+        elif kind == WASTE_TO_TABLEAU:
+            targets.pop(WASTE, None)
+            targets.pop(dst, None)
+        elif kind == FOUNDATION_TO_TABLEAU:
+            targets.pop(dst, None)
+        else:
+            targets.pop(src, None)
+            if kind == TABLEAU_TO_TABLEAU:
+                targets.pop(dst, None)
+
+    def apply(self, move):
+        self.state.apply(move)
+        self.touched(move)
+
+    def undo(self, move):
+        self.state.undo(move)
+        self.touched(move)
+
+    def legal_moves(self):
+        #ten sam zbior ruchow co KlondikeState.legal_moves, z zapamietanymi celami niezmienionych stosow
+        return self.state.legal_moves(self._targets)
+
+
+def evaluate(state):
+    score = FOUNDATION_WEIGHT * sum(state.foundations)
+    score -= HIDDEN_WEIGHT * sum(state.hidden)
+    score += EMPTY_WEIGHT * sum(1 for pile in state.tableau if not pile)
+    score -= RESERVE_WEIGHT * (len(state.stock) + len(state.waste))
+    return score
+
+def _lookahead(generator, depth):
+    #najlepsza ocena osiagalna w depth ruchach (bez dobierania kart - to nie zmienia oceny)
+    best = evaluate(generator.state)
+    if depth == 0:
+        return best
+    for move in generator.legal_moves():
+        if move[0] in (DRAW, RECYCLE):
+            continue
+        generator.apply(move)
+        best = max(best, _lookahead(generator, depth - 1))
+        generator.undo(move)
+    return best
+
+def find_hint(state, depth=HINT_DEPTH):
+    #podpowiedz dla pojedynczego stanu (state nie jest zmieniany); przy wielu podpowiedziach w jednej
+    #grze lepiej trzymac MoveGenerator obok stanu i wolac search_hint
+    return search_hint(MoveGenerator(state.copy()), depth)
+
+def search_hint(generator, depth=HINT_DEPTH):
+    #najlepszy ruch wedlug plytkiego przeszukiwania albo dobranie karty, gdy zaden ruch nic nie daje;
+    #None, gdy nie ma zadnego ruchu; stan generatora po powrocie jest taki sam jak przed wywolaniem
+    #przy rownej ocenie wygrywa ruch, ktory daje wiecej od razu (a nie dopiero w kolejnych ruchach)
+    base = evaluate(generator.state)
+    best_move = None
+    best_score = (base, base)
+    stock_move = None
+    for move in generator.legal_moves():
+        if move[0] in (DRAW, RECYCLE):
+            stock_move = move
+            continue
+        generator.apply(move)
+        score = (_lookahead(generator, depth - 1), evaluate(generator.state))
+        generator.undo(move)
+        if score[0] > base and score > best_score:
+            best_move, best_score = move, score
+    return best_move if best_move is not None else stock_move
+
+
+if __name__ == "__main__":
+    seeds = range(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
+    worst = total = calls = 0
+    for seed in seeds:
+        state = KlondikeState.deal(shuffled_order(seed))
+        #kilka ruchow z podpowiedzi, zeby mierzyc tez pozniejsze stany gry
+        for _ in range(20):
+            start = time.perf_counter()
+            move = find_hint(state)
+            elapsed = time.perf_counter() - start
+            worst = max(worst, elapsed)
+            total += elapsed
+            calls += 1
+            if move is None:
+                break
+            state.apply(move)
+    print(f"hint latency: mean {total / calls * 1000:.2f} ms, worst {worst * 1000:.2f} ms")
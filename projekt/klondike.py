@@ -0,0 +1,356 @@
+#silnik regul pasjansa Klondike bez pygame - do solverow, symulacji i testow wydajnosci
+#karta to liczba 0-51: kolor * 13 + (wartosc - 1), kolejnosc kolorow jak w Deck.create_deck
+#warianty: dobieranie po 1 albo po 3 kartach, jedna albo dwie talie (104 karty, 9 stosow glownych,
+#8 stosow docelowych); obie kopie tej samej karty maja w silniku ten sam numer
+import random
+import sys
+import time
+
+SUITS = ('hearts', 'diamonds', 'clubs', 'spades')
+SUIT_INDEX = {suit: i for i, suit in enumerate(SUITS)}
+
+#tablice pomocnicze zamiast dzielenia przy kazdym sprawdzeniu
+RANK = tuple(c % 13 + 1 for c in range(52))
+SUIT = tuple(c // 13 for c in range(52))
+RED = tuple(c // 13 < 2 for c in range(52))
+#karty, na ktore mozna polozyc dana karte w stosie glownym (o jeden wyzsze, przeciwny kolor)
+STACK_TARGETS = tuple(
+    () if RANK[c] == 13 else tuple(s * 13 + RANK[c] for s in ((2, 3) if RED[c] else (0, 1)))
+    for c in range(52)
+)
+#przy dwoch taliach druga karta o tym samym numerze na wierzchu stosu jest w slowniku wierzchow
+#pod kluczem numer + 52, wiec kazda karta ma cztery mozliwe cele
+STACK_TARGETS_TWO_DECKS = tuple(targets + tuple(t + 52 for t in targets) for targets in STACK_TARGETS)
+#cele przenoszonej karty w KlondikeState.legal_moves: wierzchy z STACK_TARGETS, a dla krola pusty stos
+#glowny (EMPTY); WASTE to klucz stosu odrzuconych kart w pamieci celow
+WASTE = 'waste'
+EMPTY = None
+MOVE_TARGETS = tuple((EMPTY,) if RANK[c] == 13 else STACK_TARGETS[c] for c in range(52))
+MOVE_TARGETS_TWO_DECKS = tuple((EMPTY,) if RANK[c] == 13 else STACK_TARGETS_TWO_DECKS[c] for c in range(52))
+
+TABLEAU_COUNT = {1: 7, 2: 9}  #liczba talii -> liczba stosow glownych
+
+#rodzaje ruchow, ruch to krotka (rodzaj, zrodlo, cel, liczba kart)
+#dla ruchow na/ze stosu docelowego indeksem jest numer stosu; stos i przyjmuje kolor i % 4,
+#wiec przy jednej talii indeks to kolor karty, a przy dwoch talii kazdy kolor ma stosy i oraz i + 4
+DRAW = 0
+RECYCLE = 1
+WASTE_TO_FOUNDATION = 2
+WASTE_TO_TABLEAU = 3
+TABLEAU_TO_FOUNDATION = 4
+TABLEAU_TO_TABLEAU = 5
+FOUNDATION_TO_TABLEAU = 6
+
+
+def card_id(suit, value):
+    return SUIT_INDEX[suit] * 13 + value - 1
+
+def card_suit_value(card):
+    return SUITS[SUIT[card]], RANK[card]
+
+def shuffled_order(seed, decks=1):
+    #kolejnosc kart po Deck(decks).shuffle(seed) - talia jest tworzona w kolejnosci numerow kart
+    #(druga talia jako 52-103), a wynik tasowania zalezy tylko od dlugosci listy i generatora
+    order = list(range(52 * decks))
+    random.Random(seed).shuffle(order)
+    return order
+
+def can_stack(card, target):
+    #czy karta moze lezec na karcie target w stosie glownym
+    return RED[card] != RED[target] and RANK[card] == RANK[target] - 1
+
+
+class KlondikeState:
+    def __init__(self, tableau, hidden, foundations, stock, waste, foundation_to_tableau=False, draw_count=1):
+        self.tableau = tableau  #7 (9 przy dwoch taliach) list kart, ostatnia karta to wierzch
+        self.hidden = hidden  #liczba zakrytych kart na spodzie kazdego stosu glownego
+        self.foundations = foundations  #liczba kart na kazdym stosie docelowym (4 albo 8)
+        self.stock = stock  #stos dobierania, zakryty
+        self.waste = waste  #stos odrzuconych kart, odkryty
+        self.foundation_to_tableau = foundation_to_tableau  #zdejmowanie ze stosow docelowych (tryb beginner)
+        self.draw_count = draw_count  #liczba kart odkrywanych naraz ze stosu dobierania
+        self.stack_targets = STACK_TARGETS if len(foundations) == 4 else STACK_TARGETS_TWO_DECKS
+        self.move_targets = MOVE_TARGETS if len(foundations) == 4 else MOVE_TARGETS_TWO_DECKS
+        self._flips = []  #czy ruch ze stosu glownego odkryl karte - potrzebne przy cofaniu
+
+    @classmethod
+    def deal(cls, order, foundation_to_tableau=False, draw_count=1):
+        #rozdanie jak w GameBoard.deal_initial_cards, order to karty w kolejnosci Deck.cards
+        #(52 albo 104 karty - liczba talii wynika z dlugosci)
+        decks = len(order) // 52
+        count = TABLEAU_COUNT[decks]
+        cards = [card % 52 for card in order]
+        tableau = [[] for _ in range(count)]
+        for i in range(count):
+            for j in range(i + 1):
+                tableau[i].append(cards.pop())
+        stock = cards[::-1]
+        return cls(tableau, list(range(count)), [0] * (4 * decks), stock, [], foundation_to_tableau, draw_count)
+
+    @classmethod
+    def from_serialized(cls, data, foundation_to_tableau=False, draw_count=1):
+        #budowa stanu z wyniku serialize_game_board (krotki kolor, wartosc, odkryta);
+        #przy jednej talii stosy docelowe planszy moga miec dowolna kolejnosc kolorow,
+        #przy dwoch stos planszy i odpowiada stosowi i silnika
+        tableau = []
+        hidden = []
+        for pile_data in data['tableau_piles']:
+            tableau.append([card_id(suit, value) for suit, value, face_up in pile_data])
+            hidden.append(sum(1 for suit, value, face_up in pile_data if not face_up))
+        foundation_piles = data['foundation_piles']
+        foundations = [0] * len(foundation_piles)
+        for i, pile_data in enumerate(foundation_piles):
+            for suit, value, face_up in pile_data:
+                f = SUIT_INDEX[suit] if len(foundation_piles) == 4 else i
+                foundations[f] = max(foundations[f], value)
+        stock = [card_id(suit, value) for suit, value, face_up in data['stock_pile']]
+        waste = [card_id(suit, value) for suit, value, face_up in data['waste_pile']]
+        return cls(tableau, hidden, foundations, stock, waste, foundation_to_tableau, draw_count)
+
+    def copy(self):
+        return KlondikeState([pile[:] for pile in self.tableau], self.hidden[:], self.foundations[:],
+                             self.stock[:], self.waste[:], self.foundation_to_tableau, self.draw_count)
+
+    def is_won(self):
+        return sum(self.foundations) == 13 * len(self.foundations)
+
+    def legal_moves(self, targets_cache=None):
+        #targets_cache: slownik zrodlo (numer stosu glownego albo WASTE) -> lista (liczba przenoszonych
+        #kart, cele karty z MOVE_TARGETS); hints.MoveGenerator trzyma go miedzy wywolaniami i usuwa wpisy
+        #stosow zmienionych przez ruch, bez niego listy sa liczone od nowa
+        move_targets = self.move_targets
+        moves = []
+        tableau = self.tableau
+        foundations = self.foundations
+        stack_targets = self.stack_targets
+        two_decks = len(foundations) > 4
+
+        #stos dobierania
+        if self.stock:
+            moves.append((DRAW, None, None, min(self.draw_count, len(self.stock))))
+        elif self.waste:
+            moves.append((RECYCLE, None, None, len(self.waste)))
+
+        #wierzchy stosow glownych - karta moze trafic tylko na jeden z dwoch (czterech) wierzchow
+        tops = {}
+        empty = []
+        for dst, pile in enumerate(tableau):
+            if pile:
+                top = pile[-1]
+                tops[top + 52 if top in tops else top] = dst
+            else:
+                empty.append(dst)
+
+        #wierzch stosu odrzuconych kart
+        if self.waste:
+            card = self.waste[-1]
+            f = SUIT[card]
+            if foundations[f] == RANK[card] - 1:
+                moves.append((WASTE_TO_FOUNDATION, None, f, 1))
+            if two_decks and foundations[f + 4] == RANK[card] - 1:
+                moves.append((WASTE_TO_FOUNDATION, None, f + 4, 1))
+            targets = None if targets_cache is None else targets_cache.get(WASTE)
+            if targets is None:
+                targets = [(1, move_targets[card])]
+                if targets_cache is not None:
+                    targets_cache[WASTE] = targets
+            for count, card_targets in targets:
+                for target in card_targets:
+                    dst = tops.get(target)
+                    if dst is not None:
+                        moves.append((WASTE_TO_TABLEAU, None, dst, count))
+                    elif target is EMPTY:
+                        for dst in empty:
+                            moves.append((WASTE_TO_TABLEAU, None, dst, count))
+
+        #stosy glowne
+        for src, pile in enumerate(tableau):
+            if not pile:
+                continue
+            top = pile[-1]
+            f = SUIT[top]
+            if foundations[f] == RANK[top] - 1:
+                moves.append((TABLEAU_TO_FOUNDATION, src, f, 1))
+            if two_decks and foundations[f + 4] == RANK[top] - 1:
+                moves.append((TABLEAU_TO_FOUNDATION, src, f + 4, 1))
+            targets = None if targets_cache is None else targets_cache.get(src)
+            if targets is None:
+                targets = []
+                size = len(pile)
+                #krol z samego spodu na pusty stos nic nie zmienia
+                for k in range(self.hidden[src] or RANK[pile[0]] == 13, size):
+                    targets.append((size - k, move_targets[pile[k]]))
+                if targets_cache is not None:
+                    targets_cache[src] = targets
+            for count, card_targets in targets:
+                for target in card_targets:
+                    dst = tops.get(target)
+                    if dst is not None:
+                        moves.append((TABLEAU_TO_TABLEAU, src, dst, count))
+                    elif target is EMPTY:
+                        for dst in empty:
+                            moves.append((TABLEAU_TO_TABLEAU, src, dst, count))
+
+        #stosy docelowe (tylko jesli tryb na to pozwala)
+        if self.foundation_to_tableau:
+            for f, count in enumerate(foundations):
+                if not count:
+                    continue
+                card = f % 4 * 13 + count - 1
+                for target in stack_targets[card]:
+                    dst = tops.get(target)
+                    if dst is not None:
+                        moves.append((FOUNDATION_TO_TABLEAU, f, dst, 1))
+                if RANK[card] == 13:
+                    for dst in empty:
+                        moves.append((FOUNDATION_TO_TABLEAU, f, dst, 1))
+        return moves
+
+    def apply(self, move):
+        #wykonanie ruchu bez sprawdzania poprawnosci (ruch z legal_moves)
+        kind, src, dst, count = move
+        if kind == DRAW:
+            if count == 1:
+                self.waste.append(self.stock.pop())
+            else:
+                self.waste.extend(reversed(self.stock[-count:]))
+                del self.stock[-count:]
+        elif kind == RECYCLE:
+            self.waste.reverse()
+            self.stock.extend(self.waste)
+            self.waste.clear()
+        elif kind == WASTE_TO_FOUNDATION:
+            self.waste.pop()
+            self.foundations[dst] += 1
+        elif kind == WASTE_TO_TABLEAU:
+            self.tableau[dst].append(self.waste.pop())
+        elif kind == FOUNDATION_TO_TABLEAU:
+            self.foundations[src] -= 1
+            self.tableau[dst].append(src % 4 * 13 + self.foundations[src])
+        else:
+            pile = self.tableau[src]
+            if kind == TABLEAU_TO_FOUNDATION:
+                pile.pop()
+                self.foundations[dst] += 1
+            else:
+                self.tableau[dst].extend(pile[-count:])
+                del pile[-count:]
+            #odkrycie karty, ktora zostala na wierzchu
+            hidden = self.hidden[src]
+            if hidden and hidden == len(pile):
+                self.hidden[src] = hidden - 1
+                self._flips.append(True)
+            else:
+                self._flips.append(False)
+
+    def undo(self, move):
+        #cofniecie ruchu - musi to byc ostatni wykonany ruch
+        kind, src, dst, count = move
+        if kind == DRAW:
+            if count == 1:
+                self.stock.append(self.waste.pop())
+            else:
+                self.stock.extend(reversed(self.waste[-count:]))
+                del self.waste[-count:]
+        elif kind == RECYCLE:
+            self.stock.reverse()
+            self.waste.extend(self.stock)
+            self.stock.clear()
+        elif kind == WASTE_TO_FOUNDATION:
+            self.foundations[dst] -= 1
+            self.waste.append(dst % 4 * 13 + self.foundations[dst])
+        elif kind == WASTE_TO_TABLEAU:
+            self.waste.append(self.tableau[dst].pop())
+        elif kind == FOUNDATION_TO_TABLEAU:
+            self.tableau[dst].pop()
+            self.foundations[src] += 1
+        else:
+            pile = self.tableau[src]
+            if self._flips.pop():
+                self.hidden[src] += 1
+            if kind == TABLEAU_TO_FOUNDATION:
+                self.foundations[dst] -= 1
+                pile.append(dst % 4 * 13 + self.foundations[dst])
+            else:
+                target = self.tableau[dst]
+                pile.extend(target[-count:])
+                del target[-count:]
+
+
+def plan_auto_finish(state):
+    #plan odlozenia wszystkich kart na stosy docelowe, liczony od razu w calosci;
+    #dla kazdego stosu docelowego sledzimy tylko kolejna potrzebna karte i sprawdzamy, czy lezy na
+    #wierzchu stosu glownego albo odrzuconych, w przeciwnym razie dobieramy ze stosu dobierania
+    #zwraca liste ruchow; gdy wygrana nie jest mozliwa (np. zakryte karty) plan konczy sie wczesniej
+    state = state.copy()
+    moves = []
+    #druga kopia karty na wierzchu (dwie talie) pod kluczem numer + 52, jak w legal_moves
+    tops = {}
+    for i, pile in enumerate(state.tableau):
+        if pile:
+            tops[pile[-1] + 52 if pile[-1] in tops else pile[-1]] = i
+    idle = 0
+    while not state.is_won():
+        moved = False
+        for f in range(len(state.foundations)):
+            while state.foundations[f] < 13:
+                card = f % 4 * 13 + state.foundations[f]
+                if state.waste and state.waste[-1] == card:
+                    move = (WASTE_TO_FOUNDATION, None, f, 1)
+                elif card in tops or card + 52 in tops:
+                    src = tops.pop(card if card in tops else card + 52)
+                    move = (TABLEAU_TO_FOUNDATION, src, f, 1)
+                else:
+                    break
+                state.apply(move)
+                moves.append(move)
+                moved = True
+                if move[0] == TABLEAU_TO_FOUNDATION and state.tableau[src]:
+                    top = state.tableau[src][-1]
+                    tops[top + 52 if top in tops else top] = src
+        if moved:
+            idle = 0
+            continue
+        #zadna potrzebna karta nie jest dostepna - przewijamy stos dobierania
+        idle += 1
+        if idle > len(state.stock) + len(state.waste) + 1:
+            break
+        if state.stock:
+            move = (DRAW, None, None, min(state.draw_count, len(state.stock)))
+        elif state.waste:
+            move = (RECYCLE, None, None, len(state.waste))
+        else:
+            break
+        state.apply(move)
+        moves.append(move)
+    return moves
+
+
+def benchmark(seconds=2.0, seed=0):
+    #losowe rozgrywki z cofaniem - liczba ruchow (apply + undo) na sekunde
+    rng = random.Random(seed)
+    moves_done = 0
+    games = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        state = KlondikeState.deal(shuffled_order(rng.getrandbits(32)))
+        played = []
+        for _ in range(200):
+            moves = state.legal_moves()
+            if not moves:
+                break
+            move = rng.choice(moves)
+            state.apply(move)
+            played.append(move)
+        moves_done += 2 * len(played)
+        while played:
+            state.undo(played.pop())
+        games += 1
+    elapsed = time.perf_counter() - start
+    return games, moves_done / elapsed
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    games, rate = benchmark(seconds)
+    print(f"{games} games, {rate:,.0f} moves/s")
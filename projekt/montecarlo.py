@@ -0,0 +1,213 @@
+#szacowanie odsetka wygranych metoda Monte Carlo - tysiace gier rozgrywanych automatycznie
+#przez wybrana polityke w puli procesow, wynik z 95% przedzialem ufnosci (Wilsona)
+#polityki: random - losowy dozwolony ruch, greedy - najpierw stosy docelowe, odkrywanie kart
+#i karty z odrzuconych, lookahead - podpowiedz (search_hint, HINT_DEPTH ruchow w przod) ruch po ruchu,
+#solver - przeszukiwanie solverem z budzetem wezlow
+#zasady poziomow jak w main(): w beginner mozna zdejmowac karty ze stosow docelowych, cofanie jest
+#w beginner i medium; solver to przeszukiwanie z nawrotami, czyli gra z cofaniem - w expert nie jest
+#mierzony (pomijany z komunikatem), pozostale polityki nie cofaja ruchow na zadnym poziomie
+#gry sa dzielone na paczki, kazda z wlasnym generatorem liczb losowych zaleznym od ziarna i numeru
+#paczki - wynik nie zalezy od liczby procesow, a wszystkie polityki i poziomy dostaja te same rozdania
+#przyklad: python montecarlo.py 100000 --policy random greedy --mode medium --workers 8
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+
+from hints import MoveGenerator, search_hint
+from klondike import (KlondikeState, shuffled_order, DRAW, RECYCLE, WASTE_TO_FOUNDATION, WASTE_TO_TABLEAU,
+                      TABLEAU_TO_FOUNDATION, TABLEAU_TO_TABLEAU)
+from solver import solve
+
+#poziom -> (zdejmowanie ze stosow docelowych, cofanie)
+MODES = {
+    'beginner': (True, True),
+    'medium': (False, True),
+    'expert': (False, False),
+}
+POLICIES = ('random', 'greedy', 'lookahead', 'solver')
+
+MAX_MOVES = 1000  #limit ruchow jednej gry
+#gra jest przegrana, gdy przez IDLE_PASSES przejsc przez stos dobierania (plus IDLE_SLACK ruchow)
+#nie przybylo kart na stosach docelowych ani odkrytych kart
+IDLE_PASSES = 2
+IDLE_SLACK = 30
+Z_95 = 1.96
+
+GameResult = namedtuple('GameResult', 'won moves unknown')
+
+#ustawienia dla procesu roboczego (ustawiane przez _init_worker)
+_settings = {}
+
+
+def _init_worker(settings):
+    _settings.update(settings)
+
+def progress_key(state):
+    return sum(state.foundations), -sum(state.hidden)
+
+def play_moves(state, choose, rng, apply=None):
+    #rozgrywka ruch po ruchu; choose(state, rng) zwraca ruch albo None, gdy ruchu nie ma;
+    #apply wykonuje ruch (domyslnie state.apply)
+    apply = apply or state.apply
+    best = progress_key(state)
+    idle = 0
+    for moves in range(MAX_MOVES):
+        if state.is_won():
+            return GameResult(True, moves, False)
+        move = choose(state, rng)
+        if move is None:
+            break
+        apply(move)
+        key = progress_key(state)
+        if key > best:
+            best = key
+            idle = 0
+        else:
+            idle += 1
+            if idle > IDLE_PASSES * (len(state.stock) + len(state.waste) + 1) + IDLE_SLACK:
+                break
+    return GameResult(state.is_won(), moves, False)
+
+def random_move(state, rng):
+    moves = state.legal_moves()
+    return rng.choice(moves) if moves else None
+
+def greedy_move(state, rng):
+    #ruch o najwyzszym priorytecie; przesuniecia miedzy stosami glownymi, ktore niczego nie odkrywaja,
+    #i zdejmowanie ze stosow docelowych sa pomijane, zeby gra nie krecila sie w kolko
+    best = None
+    best_rank = 0
+    for move in state.legal_moves():
+        kind, src, dst, count = move
+        if kind in (WASTE_TO_FOUNDATION, TABLEAU_TO_FOUNDATION):
+            rank = 4
+        elif kind == TABLEAU_TO_TABLEAU:
+            #odkrycie karty albo oproznienie stosu (na pusty stos moze trafic tylko krol, wiec to sie nie cofnie)
+            hidden = state.hidden[src]
+            size = len(state.tableau[src])
+            rank = 3 if (hidden and size - count == hidden) or (size == count and state.tableau[dst]) else 0
+        elif kind == WASTE_TO_TABLEAU:
+            rank = 2
+        elif kind in (DRAW, RECYCLE):
+            rank = 1
+        else:
+            rank = 0
+        if rank > best_rank:
+            best, best_rank = move, rank
+    return best
+
+def policy_allowed(mode, policy):
+    #solver wraca z nieudanych galezi, wiec mierzy gre z cofaniem
+    return policy != 'solver' or MODES[mode][1]
+
+def play_game(seed, mode, policy, rng):
+    foundation_to_tableau, undo = MODES[mode]
+    if policy == 'solver' and not undo:
+        raise ValueError(f"the solver policy needs undo, which {mode} mode does not allow")
+    state = KlondikeState.deal(shuffled_order(seed, _settings['decks']), foundation_to_tableau,
+                               _settings['draw_count'])
+    if policy == 'random':
+        return play_moves(state, random_move, rng)
+    if policy == 'greedy':
+        return play_moves(state, greedy_move, rng)
+    if policy == 'lookahead':
+        #jeden generator podpowiedzi na cala gre - dostaje kazdy wykonany ruch
+        generator = MoveGenerator(state)
+        return play_moves(state, lambda state, rng: search_hint(generator), rng, generator.apply)
+    result = solve(state, max_nodes=_settings['solver_nodes'])
+    return GameResult(result.status == 'solvable', len(result.moves), result.status == 'unknown')
+
+def run_chunk(task):
+    #paczka gier: (poziom, polityka, numer paczki, liczba gier) -> (poziom, polityka, wygrane, ruchy, nieznane)
+    mode, policy, chunk, count = task
+    deals = random.Random(f"{_settings['seed']}:{chunk}")
+    rng = random.Random(f"{_settings['seed']}:{chunk}:{mode}:{policy}")
+    wins = moves = unknown = 0
+    for _ in range(count):
+        result = play_game(deals.getrandbits(32), mode, policy, rng)
+        wins += result.won
+        moves += result.moves
+        unknown += result.unknown
+    return mode, policy, count, wins, moves, unknown
+
+def wilson_interval(wins, games, z=Z_95):
+    if not games:
+        return 0.0, 0.0
+    p = wins / games
+    denominator = 1 + z * z / games
+    centre = (p + z * z / (2 * games)) / denominator
+    half = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / denominator
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+def estimate(games, modes, policies, workers=None, seed=0, draw_count=1, decks=1, solver_nodes=5_000,
+             chunk_size=100, progress=True):
+    workers = workers or os.cpu_count()
+    settings = {'seed': seed, 'draw_count': draw_count, 'decks': decks, 'solver_nodes': solver_nodes}
+    pairs = [(mode, policy) for mode in modes for policy in policies if policy_allowed(mode, policy)]
+    skipped = [mode for mode in modes if not policy_allowed(mode, 'solver')] if 'solver' in policies else []
+    if skipped and progress:
+        print(f"solver needs undo, skipped in: {', '.join(skipped)} (use lookahead there)", file=sys.stderr)
+    tasks = []
+    for chunk, start in enumerate(range(0, games, chunk_size)):
+        count = min(chunk_size, games - start)
+        tasks += [(mode, policy, chunk, count) for mode, policy in pairs]
+    totals = {pair: [0, 0, 0, 0] for pair in pairs}
+    total = games * len(totals)
+    done = 0
+    began = time.perf_counter()
+    with multiprocessing.Pool(workers, _init_worker, (settings,)) as pool:
+        for mode, policy, count, wins, moves, unknown in pool.imap_unordered(run_chunk, tasks):
+            row = totals[mode, policy]
+            row[0] += count
+            row[1] += wins
+            row[2] += moves
+            row[3] += unknown
+            done += count
+            if progress:
+                rate = done / (time.perf_counter() - began)
+                print(f"\r{done}/{total} games, {rate:.0f} games/s", end='', file=sys.stderr)
+    elapsed = time.perf_counter() - began
+    if progress:
+        print(f"\r{done}/{total} games in {elapsed:.1f} s ({done / elapsed:.0f} games/s, {workers} workers)",
+              file=sys.stderr)
+    results = []
+    for (mode, policy), (count, wins, moves, unknown) in totals.items():
+        low, high = wilson_interval(wins, count)
+        results.append({'mode': mode, 'policy': policy, 'games': count, 'wins': wins,
+                        'win_rate': wins / count if count else 0.0, 'ci95': [low, high],
+                        'mean_moves': moves / count if count else 0.0, 'unknown': unknown})
+    return results
+
+def print_results(results):
+    print(f"{'mode':>9} {'policy':>9} {'games':>8} {'win rate':>9} {'95% CI':>17} {'moves':>7} {'unknown':>8}")
+    for r in results:
+        low, high = r['ci95']
+        print(f"{r['mode']:>9} {r['policy']:>9} {r['games']:>8} {r['win_rate'] * 100:>8.2f}% "
+              f"{low * 100:>7.2f}-{high * 100:.2f}% {r['mean_moves']:>7.1f} {r['unknown']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate solitaire win rates by simulating games.")
+    parser.add_argument('games', type=int, help="games per mode and policy")
+    parser.add_argument('--mode', nargs='+', choices=list(MODES), default=list(MODES), help="difficulty modes")
+    parser.add_argument('--policy', nargs='+', choices=POLICIES, default=list(POLICIES), help="playing policies")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--seed', type=int, default=0, help="seed for deals and policy randomness")
+    parser.add_argument('--draw', type=int, choices=(1, 3), default=1, help="cards per draw")
+    parser.add_argument('--decks', type=int, choices=(1, 2), default=1, help="number of decks")
+    parser.add_argument('--solver-nodes', type=int, default=5_000, help="solver node budget per game")
+    parser.add_argument('--chunk-size', type=int, default=100, help="games sent to a worker at once")
+    parser.add_argument('--output', help="also write the results as JSON to this file")
+    args = parser.parse_args()
+    results = estimate(args.games, args.mode, args.policy, args.workers, args.seed, args.draw, args.decks,
+                       args.solver_nodes, args.chunk_size)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,138 @@
+#pomiar czasu klatek petli gry z podzialem na fazy (zdarzenia, tlo, plansza, tekst, ...)
+#kroczace percentyle p50/p95/p99 do nakladki na ekranie i eksport probek do formatu Chrome trace
+#(chrome://tracing albo https://ui.perfetto.dev)
+#wylaczony profiler nic nie zapisuje - phase() zwraca wspolny pusty obiekt; wyjatkiem sa znaczniki
+#jednorazowych zdarzen (mark, np. czas do pierwszej klatki), zapisywane zawsze
+import json
+import time
+from collections import deque
+
+WINDOW = 300  #liczba ostatnich klatek do percentyli
+MAX_TRACE_FRAMES = 20_000  #liczba klatek zachowanych do eksportu
+OVERLAY_INTERVAL = 30  #co ile klatek odswiezane sa napisy nakladki
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, self.start, time.perf_counter())
+        return False
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class FrameProfiler:
+    def __init__(self, enabled=False, origin=None):
+        self.enabled = enabled
+        self.origin = time.perf_counter() if origin is None else origin
+        self.marks = {}  #nazwa -> sekundy od origin
+        self.frame_times = deque(maxlen=WINDOW)  #czas pracy klatki w sekundach
+        self.phase_times = {}  #faza -> deque czasow w kolejnych klatkach
+        self.frames = deque(maxlen=MAX_TRACE_FRAMES)  #(poczatek, koniec, [(faza, poczatek, koniec)])
+        self.overlay_lines = ()
+        self._phases = {}
+        self._frame_start = None
+        self._segments = []
+        self._count = 0
+
+    def phase(self, name):
+        #context manager mierzacy fragment klatki; ta sama faza moze wystapic kilka razy w klatce
+        if not self.enabled:
+            return _NULL_PHASE
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = _Phase(self, name)
+        return phase
+
+    def mark(self, name, at=None):
+        #pierwsze wystapienie zdarzenia (kolejne sa pomijane)
+        if name not in self.marks:
+            self.marks[name] = (time.perf_counter() if at is None else at) - self.origin
+
+    def add(self, name, start, end):
+        if self._frame_start is not None:
+            self._segments.append((name, start, end))
+
+    def begin_frame(self):
+        if self.enabled:
+            self._frame_start = time.perf_counter()
+            self._segments = []
+
+    def end_frame(self):
+        #koniec pracy klatki (przed czekaniem na kolejna klatke)
+        if self._frame_start is None:
+            return
+        end = time.perf_counter()
+        self.frame_times.append(end - self._frame_start)
+        totals = dict.fromkeys(self.phase_times, 0.0)
+        for name, start, stop in self._segments:
+            totals[name] = totals.get(name, 0.0) + stop - start
+        for name, total in totals.items():
+            times = self.phase_times.get(name)
+            if times is None:
+                times = self.phase_times[name] = deque(maxlen=WINDOW)
+            times.append(total)
+        self.frames.append((self._frame_start, end, self._segments))
+        self._frame_start = None
+        self._count += 1
+        if self._count % OVERLAY_INTERVAL == 0:
+            self.overlay_lines = self.summary_lines()
+
+    def percentiles(self):
+        values = sorted(self.frame_times)
+        return tuple(percentile(values, p) for p in (0.5, 0.95, 0.99))
+
+    def summary_lines(self):
+        p50, p95, p99 = self.percentiles()
+        lines = [f"frame p50 {p50 * 1000:.2f}  p95 {p95 * 1000:.2f}  p99 {p99 * 1000:.2f} ms"]
+        if self.marks:
+            lines.append('  '.join(f"{name} {seconds * 1000:.0f}" for name, seconds in self.marks.items()) + " ms")
+        for name, times in self.phase_times.items():
+            mean = sum(times) / len(times) if times else 0.0
+            worst = percentile(sorted(times), 0.99)
+            lines.append(f"{name:<8} mean {mean * 1000:.2f}  p99 {worst * 1000:.2f} ms")
+        return tuple(lines)
+
+    def chrome_trace(self):
+        #zdarzenia typu 'X' (poczatek + czas trwania) w mikrosekundach; fazy leza wewnatrz klatek
+        events = []
+        origin = self.origin
+        for name, seconds in self.marks.items():
+            events.append({'name': name, 'cat': 'startup', 'ph': 'i', 's': 'g', 'pid': 1, 'tid': 1,
+                           'ts': seconds * 1e6})
+        for i, (start, end, segments) in enumerate(self.frames):
+            events.append({'name': 'frame', 'cat': 'frame', 'ph': 'X', 'pid': 1, 'tid': 1,
+                           'ts': (start - origin) * 1e6, 'dur': (end - start) * 1e6, 'args': {'index': i}})
+            for name, seg_start, seg_end in segments:
+                events.append({'name': name, 'cat': 'phase', 'ph': 'X', 'pid': 1, 'tid': 1,
+                               'ts': (seg_start - origin) * 1e6, 'dur': (seg_end - seg_start) * 1e6})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
@@ -0,0 +1,215 @@
+#zapis rozgrywek: ziarno rozdania + lista ruchow silnika klondike, kazdy ruch jako varint
+#plik to naglowek (znacznik i wersja) i dowolna liczba rekordow gier, dopisywanych na koncu:
+#  varint ziarno, varint flagi, varint liczba ruchow, ruchy
+#ruch (rodzaj, zrodlo, cel, liczba kart) jest skladany w jedna liczbe:
+#  rodzaj + 8 * (zrodlo + 1) + 128 * (cel + 1) + 2048 * (liczba kart - 1), brak indeksu = 0,
+#wiec dobranie jednej karty zajmuje jeden bajt, a pozostale ruchy zwykle dwa; UNDO oznacza cofniecie
+#przyklad: python replay.py replays/games.rep --check
+#          python replay.py bench.rep --generate 1000 (zapis losowych rozgrywek do testow wydajnosci)
+import argparse
+import os
+import random
+import time
+from collections import namedtuple
+
+from klondike import KlondikeState, shuffled_order, DRAW, RECYCLE
+
+REPLAY_MAGIC = b'SREP'
+REPLAY_VERSION = 1
+UNDO = 7  #rodzaj ruchu nieuzywany przez silnik
+#wersja pliku -> (bity na indeks stosu, maska indeksu)
+INDEX_BITS = {1: (4, 15)}
+
+#flagi rekordu
+FOUNDATION_TO_TABLEAU_FLAG = 1  #gra w trybie beginner
+WON_FLAG = 2  #gra zakonczona wygrana
+DRAW_THREE_FLAG = 4  #dobieranie po trzy karty
+TWO_DECKS_FLAG = 8  #dwie talie
+
+Replay = namedtuple('Replay', 'seed flags moves')
+ReplayResult = namedtuple('ReplayResult', 'won moves undos')
+
+
+class ReplayError(ValueError):
+    pass
+
+
+def encode_varint(value, out):
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+def variant_flags(draw_count, decks):
+    return (DRAW_THREE_FLAG if draw_count == 3 else 0) | (TWO_DECKS_FLAG if decks == 2 else 0)
+
+def replay_variant(flags):
+    #(liczba dobieranych kart, liczba talii) z flag rekordu
+    return 3 if flags & DRAW_THREE_FLAG else 1, 2 if flags & TWO_DECKS_FLAG else 1
+
+def encode_move(move):
+    if move == UNDO:
+        return UNDO
+    kind, src, dst, count = move
+    src = 0 if src is None else src + 1
+    dst = 0 if dst is None else dst + 1
+    return kind | src << 3 | dst << 7 | (count - 1) << 11
+
+def decode_move(token, version=REPLAY_VERSION):
+    kind = token & 7
+    if kind == UNDO:
+        return UNDO
+    bits, mask = INDEX_BITS[version]
+    src = (token >> 3 & mask) - 1
+    dst = (token >> 3 + bits & mask) - 1
+    return kind, None if src < 0 else src, None if dst < 0 else dst, (token >> 3 + 2 * bits) + 1
+
+def encode_replay(replay, out=None):
+    out = bytearray() if out is None else out
+    encode_varint(replay.seed, out)
+    encode_varint(replay.flags, out)
+    encode_varint(len(replay.moves), out)
+    for move in replay.moves:
+        encode_varint(encode_move(move), out)
+    return out
+
+def decode_varints(data, pos=0):
+    #wszystkie liczby od pozycji pos w jednej petli
+    values = []
+    value = shift = 0
+    for byte in memoryview(data)[pos:]:
+        if byte < 0x80:
+            values.append(value | byte << shift)
+            value = shift = 0
+        else:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+    if shift:
+        raise ReplayError("truncated varint")
+    return values
+
+def decode_replays(data):
+    if data[:len(REPLAY_MAGIC)] != REPLAY_MAGIC or len(data) <= len(REPLAY_MAGIC):
+        raise ReplayError("not a replay file")
+    version = data[len(REPLAY_MAGIC)]
+    if version not in INDEX_BITS:
+        raise ReplayError(f"unsupported replay version {version}")
+    values = decode_varints(data, len(REPLAY_MAGIC) + 1)
+    #ruchow jest niewiele rodzajow, wiec kazda liczba jest dekodowana raz
+    decoded = {}
+    replays = []
+    pos = 0
+    while pos < len(values):
+        if pos + 3 > len(values):
+            raise ReplayError("truncated replay")
+        seed, flags, count = values[pos:pos + 3]
+        pos += 3
+        tokens = values[pos:pos + count]
+        if len(tokens) < count:
+            raise ReplayError(f"seed {seed}: truncated move list")
+        pos += count
+        moves = []
+        for token in tokens:
+            move = decoded.get(token)
+            if move is None:
+                move = decoded[token] = decode_move(token, version)
+            moves.append(move)
+        replays.append(Replay(seed, flags, moves))
+    return replays
+
+def append_replay(path, replay):
+    #dopisanie gry na koniec pliku, nowy plik dostaje naglowek
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = encode_replay(replay)
+    with open(path, 'ab') as f:
+        if f.tell() == 0:
+            f.write(REPLAY_MAGIC + bytes([REPLAY_VERSION]))
+        f.write(data)
+
+def write_replays(path, replays):
+    out = bytearray(REPLAY_MAGIC + bytes([REPLAY_VERSION]))
+    for replay in replays:
+        encode_replay(replay, out)
+    with open(path, 'wb') as f:
+        f.write(out)
+
+def read_replays(path):
+    with open(path, 'rb') as f:
+        return decode_replays(f.read())
+
+
+def run_replay(replay, check=False):
+    #odtworzenie gry na silniku bez pygame; check=True sprawdza, czy kazdy ruch byl dozwolony
+    draw_count, decks = replay_variant(replay.flags)
+    state = KlondikeState.deal(shuffled_order(replay.seed, decks), bool(replay.flags & FOUNDATION_TO_TABLEAU_FLAG),
+                               draw_count)
+    played = []
+    undos = 0
+    for i, move in enumerate(replay.moves):
+        if move == UNDO:
+            if not played:
+                raise ReplayError(f"seed {replay.seed}: undo with no moves at {i}")
+            state.undo(played.pop())
+            undos += 1
+            continue
+        if check and move not in state.legal_moves():
+            raise ReplayError(f"seed {replay.seed}: illegal move {move} at {i}")
+        state.apply(move)
+        played.append(move)
+    won = state.is_won()
+    if check and won != bool(replay.flags & WON_FLAG):
+        raise ReplayError(f"seed {replay.seed}: recorded result does not match")
+    return ReplayResult(won, len(replay.moves), undos)
+
+def random_replay(seed, rng, max_moves=300, undo_rate=0.05, draw_count=1, decks=1):
+    #losowa rozgrywka do testow wydajnosci odtwarzania
+    state = KlondikeState.deal(shuffled_order(seed, decks), draw_count=draw_count)
+    played = []
+    moves = []
+    for _ in range(max_moves):
+        if played and rng.random() < undo_rate:
+            state.undo(played.pop())
+            moves.append(UNDO)
+            continue
+        legal = state.legal_moves()
+        if not legal:
+            break
+        #przewijanie stosu dobierania tylko gdy nie ma nic innego, zeby gra nie krecila sie w kolko
+        useful = [move for move in legal if move[0] not in (DRAW, RECYCLE)] or legal
+        move = rng.choice(useful)
+        state.apply(move)
+        played.append(move)
+        moves.append(move)
+    flags = variant_flags(draw_count, decks) | (WON_FLAG if state.is_won() else 0)
+    return Replay(seed, flags, moves)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded solitaire games headlessly.")
+    parser.add_argument('path', help="replay file")
+    parser.add_argument('--check', action='store_true', help="verify that every move is legal and results match")
+    parser.add_argument('--generate', type=int, default=0, metavar='N', help="write N random games to path first")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for --generate")
+    parser.add_argument('--draw', type=int, choices=(1, 3), default=1, help="cards per draw for --generate")
+    parser.add_argument('--decks', type=int, choices=(1, 2), default=1, help="number of decks for --generate")
+    args = parser.parse_args()
+
+    if args.generate:
+        rng = random.Random(args.seed)
+        write_replays(args.path, [random_replay(rng.getrandbits(32), rng, draw_count=args.draw, decks=args.decks)
+                                  for _ in range(args.generate)])
+
+    start = time.perf_counter()
+    replays = read_replays(args.path)
+    decoded = time.perf_counter()
+    won = moves = 0
+    for replay in replays:
+        result = run_replay(replay, args.check)
+        won += result.won
+        moves += result.moves
+    elapsed = time.perf_counter() - start
+    print(f"{len(replays)} games ({won} won), {moves} moves, {os.path.getsize(args.path)} bytes")
+    print(f"decode {decoded - start:.3f} s, total {elapsed:.3f} s, "
+          f"{len(replays) / elapsed:,.0f} games/s, {moves / elapsed:,.0f} moves/s")
@@ -0,0 +1,137 @@
+#zapis przerwanej gry do wznowienia po ponownym uruchomieniu
+#plik: naglowek (znacznik, wersja, poziom, flagi wariantu, czas gry w ms, ziarno rozdania),
+#plansza jako CompactBoard.key() (bajt na karte w kazdym stosie, dlugosci stosow przed kartami)
+#i przebieg gry jako ruchy w kodowaniu replay.py - zeby po wznowieniu powtorka nadal byla kompletna
+#zapis przez plik tymczasowy i os.replace, wiec przerwany zapis nie psuje poprzedniego stanu
+import os
+import struct
+from collections import Counter, namedtuple
+
+from compact import CARD_MASK, FACE_UP, CompactBoard
+from klondike import (TABLEAU_COUNT, DRAW, RECYCLE, WASTE_TO_FOUNDATION, WASTE_TO_TABLEAU, TABLEAU_TO_FOUNDATION,
+                      TABLEAU_TO_TABLEAU, FOUNDATION_TO_TABLEAU)
+from replay import (UNDO, ReplayError, encode_move, encode_varint, decode_move, decode_varints, replay_variant,
+                    variant_flags)
+
+SAVE_MAGIC = b'SSAV'
+SAVE_VERSION = 1
+HEADER = struct.Struct('<4sBBBII')  #znacznik, wersja, poziom, flagi, czas gry w ms, ziarno
+DIFFICULTIES = ('beginner', 'medium', 'expert')
+#wersja zapisu -> wersja kodowania ruchow z replay.py, w ktorej zapisany jest przebieg gry
+MOVE_VERSIONS = {1: 1}
+
+#rodzaj ruchu -> (zrodlo, cel): 'tableau', 'foundation' albo None (brak indeksu)
+MOVE_PILES = {
+    DRAW: (None, None),
+    RECYCLE: (None, None),
+    WASTE_TO_FOUNDATION: (None, 'foundation'),
+    WASTE_TO_TABLEAU: (None, 'tableau'),
+    TABLEAU_TO_FOUNDATION: ('tableau', 'foundation'),
+    TABLEAU_TO_TABLEAU: ('tableau', 'tableau'),
+    FOUNDATION_TO_TABLEAU: ('foundation', 'tableau'),
+}
+
+SavedGame = namedtuple('SavedGame', 'board difficulty draw_count decks elapsed_ms seed history')
+
+
+class SaveError(ValueError):
+    pass
+
+
+def encode_game(saved):
+    flags = variant_flags(saved.draw_count, saved.decks)
+    out = bytearray(HEADER.pack(SAVE_MAGIC, SAVE_VERSION, DIFFICULTIES.index(saved.difficulty), flags,
+                                saved.elapsed_ms, saved.seed))
+    out += saved.board.key()
+    encode_varint(len(saved.history), out)
+    for move in saved.history:
+        encode_varint(encode_move(move), out)
+    return out
+
+def check_board(board, decks):
+    #plansza z pliku musi byc pelna talia (talie): kazda karta 0-51 dokladnie decks razy,
+    #zakryte karty tylko na spodzie stosow glownych
+    cards = Counter()
+    for pile in board.tableau:
+        face_up = False
+        for byte in pile:
+            if face_up and not byte & FACE_UP:
+                raise SaveError("face-down card above a face-up one")
+            face_up = bool(byte & FACE_UP)
+            cards[byte & CARD_MASK] += 1
+    for byte in board.stock + board.waste:
+        cards[byte & CARD_MASK] += 1
+    for byte in board.foundations:
+        suit, count = byte >> 4, byte & 15
+        if suit >= 4 or count > 13:
+            raise SaveError(f"bad foundation byte {byte}")
+        cards.update(range(suit * 13, suit * 13 + count))
+    if any(card >= 52 for card in cards):
+        raise SaveError(f"bad card {max(cards)}")
+    if len(cards) != 52 or any(count != decks for count in cards.values()):
+        raise SaveError("board is not a full deck")
+
+def check_move(move, decks):
+    if move == UNDO:
+        return
+    kind, src, dst, count = move
+    if kind not in MOVE_PILES:
+        raise SaveError(f"bad move kind {kind}")
+    limits = {None: 0, 'tableau': TABLEAU_COUNT[decks], 'foundation': 4 * decks}
+    for index, pile in zip((src, dst), MOVE_PILES[kind]):
+        if (index is None) != (pile is None) or (index is not None and index >= limits[pile]):
+            raise SaveError(f"bad move {move}")
+    if count > 52 * decks:
+        raise SaveError(f"bad move {move}")
+
+def decode_game(data):
+    if len(data) < HEADER.size:
+        raise SaveError("truncated save file")
+    magic, version, difficulty, flags, elapsed_ms, seed = HEADER.unpack_from(data)
+    if magic != SAVE_MAGIC:
+        raise SaveError("not a save file")
+    if version != SAVE_VERSION:
+        raise SaveError(f"unsupported save version {version}")
+    if difficulty >= len(DIFFICULTIES):
+        raise SaveError(f"unknown difficulty {difficulty}")
+    draw_count, decks = replay_variant(flags)
+    try:
+        board = CompactBoard.from_bytes(data[HEADER.size:], TABLEAU_COUNT[decks], 4 * decks)
+    except IndexError:
+        raise SaveError("truncated board") from None
+    check_board(board, decks)
+    pos = HEADER.size + len(board.key())
+    try:
+        values = decode_varints(data, pos)
+    except ReplayError:
+        raise SaveError("truncated move history") from None
+    if not values or len(values) != values[0] + 1:
+        raise SaveError("truncated move history")
+    history = [decode_move(token, MOVE_VERSIONS[version]) for token in values[1:]]
+    for move in history:
+        check_move(move, decks)
+    return SavedGame(board, DIFFICULTIES[difficulty], draw_count, decks, elapsed_ms, seed, history)
+
+def save_game(path, saved):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(encode_game(saved))
+    os.replace(tmp_path, path)
+
+def load_game(path):
+    #zapisana gra albo None, gdy pliku nie ma
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    return decode_game(data)
+
+def delete_game(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
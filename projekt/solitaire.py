@@ -1,39 +1,158 @@
+import time
+STARTED = time.perf_counter()  #punkt odniesienia dla czasu do pierwszej klatki (razem z importem pygame)
 import pygame
 import sys
 import os
 import random
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
+from card_assets import AssetLoader, load_background, load_card_atlas
+from compact import CompactBoard
+from hints import MoveGenerator, search_hint
+from profiler import FrameProfiler
+from klondike import (KlondikeState, plan_auto_finish, shuffled_order, DRAW, RECYCLE, WASTE_TO_FOUNDATION,
+                      WASTE_TO_TABLEAU, TABLEAU_TO_FOUNDATION, TABLEAU_TO_TABLEAU, FOUNDATION_TO_TABLEAU,
+                      SUITS, SUIT_INDEX, TABLEAU_COUNT)
+from replay import Replay, UNDO, FOUNDATION_TO_TABLEAU_FLAG, WON_FLAG, append_replay, variant_flags
+from savegame import SavedGame, delete_game, load_game, save_game
+from solver import solve
 
-#inicjalizacja pygame
-pygame.init()
+FPS = 60  #klatki na sekunde w czasie przeciagania i animacji
+IDLE_TIMEOUT = 1000  #najdluzsze czekanie na zdarzenie w ms, gdy nic sie nie rusza (menu, ekran wygranej)
+BACKGROUND_PATH = os.path.join('assets', 'background.jpg')
 
-#pobranie informacji o ekranie
-screen_info = pygame.display.Info()
-WINDOW_WIDTH = screen_info.current_w
-WINDOW_HEIGHT = screen_info.current_h
+#limity solvera przy losowaniu rozdan z gwarantowanym rozwiazaniem (klucz: liczba talii);
+#przy dwoch taliach 3000 wezlow rozwiazuje ok. 1 rozdanie na 40, 20 000 - ok. 1 na 4 (0,8 s na rozdanie),
+#wiec i tak zdarza sie, ze czas minie - takie rozdanie jest oznaczane na ekranie jako niesprawdzone
+WINNABLE_DEAL_TIME = {1: 0.4, 2: 1.5}  #laczny czas szukania rozdania w sekundach
+WINNABLE_SOLVE_NODES = {1: 3000, 2: 20_000}  #limit wezlow dla jednego rozdania
+AUTOFINISH_FRAMES = 5  #liczba klatek lotu jednej karty przy auto-finish
+REPLAY_PATH = os.path.join('replays', 'games.rep')  #zapis rozegranych gier (replay.py)
+SAVE_PATH = os.path.join('saves', 'autosave.sav')  #przerwana gra do wznowienia (savegame.py)
 
-#ustawienia wymiarow kart i odstepow
-CARD_WIDTH = int(WINDOW_WIDTH * 0.08)    
-CARD_HEIGHT = int(CARD_WIDTH * 1.4)    
-CARD_SPACING = int(CARD_WIDTH * 0.3)    
-PILE_SPACING = int(CARD_WIDTH * 0.2)     
-FPS = 60
+#profilowanie klatek wlaczane zmienna srodowiskowa SOLITAIRE_PROFILE=1; F3 pokazuje/ukrywa nakladke,
+#a po wyjsciu probki trafiaja do pliku Chrome trace (SOLITAIRE_TRACE, domyslnie solitaire_trace.json)
+profiler = FrameProfiler(enabled=bool(os.environ.get('SOLITAIRE_PROFILE')), origin=STARTED)
+TRACE_PATH = os.environ.get('SOLITAIRE_TRACE', 'solitaire_trace.json')
 
 #definicja kolorow
 WHITE = (255, 255, 255)
 GREEN = (0, 128, 0)
 BLACK = (0, 0, 0)
+HINT_COLOR = (80, 200, 255)  #obramowanie kart wskazanych przez podpowiedz
 
-#utworzenie okna gry
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.FULLSCREEN)
-pygame.display.set_caption("Solitaire")
-clock = pygame.time.Clock()
+#okno i wymiary zalezne od rozdzielczosci - ustawiane przez init_display / set_geometry
+screen = None
+clock = None
+layout = None
 
-#wczytanie tla i tylu karty
-background = pygame.image.load(os.path.join('assets', 'background.jpg'))
-background = pygame.transform.scale(background, (WINDOW_WIDTH, WINDOW_HEIGHT))
-card_back = pygame.image.load(os.path.join('assets', 'cardback.png'))
-card_back = pygame.transform.scale(card_back, (CARD_WIDTH, CARD_HEIGHT))
+def set_geometry(width, height, decks=1):
+    #wymiary kart, odstepow i stalych fragmentow ekranu dla danej rozdzielczosci i liczby talii
+    global WINDOW_WIDTH, WINDOW_HEIGHT, CARD_WIDTH, CARD_HEIGHT, CARD_SPACING, PILE_SPACING
+    global HINT_RECT, TIMER_RECT, UNVERIFIED_RECT, AUTOFINISH_AREA, PROFILE_RECT, FOUNDATION_AREA, layout
+    WINDOW_WIDTH = width
+    WINDOW_HEIGHT = height
+    tableau_count = TABLEAU_COUNT[decks]
+
+    #ustawienia wymiarow kart i odstepow - stosy glowne zajmuja zawsze te sama szerokosc ekranu
+    CARD_WIDTH = int(WINDOW_WIDTH * 0.56 / tableau_count)
+    CARD_HEIGHT = int(CARD_WIDTH * 1.4)
+    CARD_SPACING = int(CARD_WIDTH * 0.3)
+    PILE_SPACING = int(CARD_WIDTH * 0.2)
+
+    #stale fragmenty ekranu odswiezane przez DirtyRenderer
+    HINT_RECT = pygame.Rect(WINDOW_WIDTH - 160, 80, 140, 50)
+    TIMER_RECT = pygame.Rect(20, WINDOW_HEIGHT - 140, 260, 30)
+    UNVERIFIED_RECT = pygame.Rect(20, WINDOW_HEIGHT - 170, 260, 30)
+    AUTOFINISH_AREA = pygame.Rect((WINDOW_WIDTH - 400) // 2, WINDOW_HEIGHT - 230, 400, 70)
+    PROFILE_RECT = pygame.Rect(WINDOW_WIDTH - 420, WINDOW_HEIGHT - 180, 410, 170)
+    layout = BoardLayout(tableau_count, 4 * decks)
+    FOUNDATION_AREA = pygame.Rect(layout.foundation_x, layout.top_y, 4 * decks * layout.pitch, CARD_HEIGHT)
+
+def init_display():
+    #tylko to, czego potrzebuje menu: okno i czcionki; pozostale moduly pygame (dzwiek, joysticki)
+    #sa inicjalizowane dopiero po pierwszej klatce
+    global screen, clock
+    pygame.display.init()
+    pygame.font.init()
+    screen_info = pygame.display.Info()
+    set_geometry(screen_info.current_w, screen_info.current_h)
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.FULLSCREEN)
+    pygame.display.set_caption("Solitaire")
+    #ruch myszy nie jest obslugiwany (przeciagane karty ida za pygame.mouse.get_pos), wiec nie powinien
+    #budzic bezczynnej petli
+    pygame.event.set_blocked(pygame.MOUSEMOTION)
+    clock = pygame.time.Clock()
+
+def wait_for_frame(active, timeout):
+    #koniec klatki: w czasie przeciagania i animacji stale FPS, poza tym blokada w pygame.event.wait
+    #do zdarzenia albo uplywu timeout ms - bezczynna gra nie zajmuje procesora;
+    #zwraca zdarzenie, ktore obudzilo petle (obslugiwane w nastepnej klatce razem z reszta kolejki)
+    if active:
+        clock.tick(FPS)
+        return []
+    event = pygame.event.wait(timeout)
+    return [] if event.type == pygame.NOEVENT else [event]
+
+#tlo i obrazy kart: wczytywane w tle przez AssetLoader (start_asset_loading) albo na zadanie
+_asset_loader = None
+_backgrounds = {}  #(szerokosc, wysokosc) -> tlo w formacie ekranu
+
+#wspolne obrazy kart w dokladnym rozmiarze karty, klucz: (szerokosc, wysokosc)
+#caly zestaw jest wczytywany raz (z pamieci podrecznej na dysku), karty dziela te same powierzchnie
+_card_atlases = {}
+
+def start_asset_loading():
+    global _asset_loader
+    _asset_loader = AssetLoader(BACKGROUND_PATH, (WINDOW_WIDTH, WINDOW_HEIGHT), (CARD_WIDTH, CARD_HEIGHT))
+
+def _collect_loaded_assets():
+    #przejecie wyniku watku wczytujacego (czeka na niego, jesli jeszcze pracuje)
+    global _asset_loader
+    loader = _asset_loader
+    _asset_loader = None
+    background, atlas = loader.result()
+    _backgrounds[loader.window_size] = background
+    _card_atlases[loader.card_size] = atlas
+    profiler.mark('assets_ready', loader.finished_at)
+
+def poll_asset_loading():
+    #przejecie zasobow, gdy watek skonczyl prace - wolane w petli menu, zeby start gry nie czekal
+    if _asset_loader is not None and _asset_loader.done():
+        _collect_loaded_assets()
+
+def get_background():
+    size = (WINDOW_WIDTH, WINDOW_HEIGHT)
+    if size not in _backgrounds:
+        if _asset_loader is not None and _asset_loader.window_size == size:
+            _collect_loaded_assets()
+        else:
+            _backgrounds[size] = load_background(BACKGROUND_PATH, size).convert()
+    return _backgrounds[size]
+
+def get_card_atlas():
+    size = (CARD_WIDTH, CARD_HEIGHT)
+    atlas = _card_atlases.get(size)
+    if atlas is None:
+        if _asset_loader is not None and _asset_loader.card_size == size:
+            _collect_loaded_assets()
+        else:
+            _card_atlases[size] = load_card_atlas(size)
+        atlas = _card_atlases[size]
+    return atlas
+
+def get_card_sprite(suit, value):
+    return get_card_atlas()[(suit, value)]
+
+def draw_outline(surface, color, rect, width):
+    #obramowanie z czterech wypelnionych pasow - w przeciwienstwie do pygame.draw.rect z gruboscia
+    #wyglada tak samo przy rysowaniu z obcieciem do fragmentu ekranu (DirtyRenderer)
+    x, y, w, h = rect
+    surface.fill(color, (x, y, w, width))
+    surface.fill(color, (x, y + h - width, w, width))
+    surface.fill(color, (x, y, width, h))
+    surface.fill(color, (x + w - width, y, width, h))
 
 class Card:
     def __init__(self, suit, value):
@@ -41,33 +160,15 @@ class Card:
         self.value = value  #wartosc karty
         self.face_up = False  #czy karta jest odkryta
         self.image = None
+        self.back = None
         self.rect = None
         self.load_image()
         
     def load_image(self):
-        #mapowanie wartosci kart na symbole
-        value_map = {
-            1: 'A',   #As
-            10: 'T',  #10
-            11: 'J',  #Walet
-            12: 'Q',  #Dama
-            13: 'K'   #Krol
-        }
-        value_str = value_map.get(self.value, str(self.value))
-        
-        #mapowanie kolorow kart na symbole
-        suit_map = {
-            'hearts': 'H',    #Kiery
-            'diamonds': 'D',  #Karo
-            'clubs': 'C',     #Trefl
-            'spades': 'S'     #Pik
-        }
-        suit_str = suit_map[self.suit]
-        
-        #wczytanie obrazu karty
-        image_path = os.path.join('assets', 'cards', 'png', f'{value_str}{suit_str}.png')
-        self.image = pygame.image.load(image_path)
-        self.image = pygame.transform.scale(self.image, (CARD_WIDTH, CARD_HEIGHT))
+        #pobranie wspolnego obrazu karty z bufora (bez odczytu z dysku po pierwszym razie)
+        atlas = get_card_atlas()
+        self.image = atlas[(self.suit, self.value)]
+        self.back = atlas['back']
         self.rect = self.image.get_rect()
 
     def draw(self, surface, x, y):
@@ -77,23 +178,27 @@ class Card:
         if self.face_up:
             surface.blit(self.image, self.rect)
         else:
-            surface.blit(card_back, self.rect)
+            surface.blit(self.back, self.rect)
 
 class Deck:
-    def __init__(self):
+    def __init__(self, decks=1):
         self.cards = []
-        self.create_deck()
+        self.create_deck(decks)
         
-    def create_deck(self):
-        #tworzenie talii kart
+    def create_deck(self, decks=1):
+        #tworzenie talii kart (przy dwoch taliach druga jest dokladana za pierwsza)
         suits = ['hearts', 'diamonds', 'clubs', 'spades'] 
-        for suit in suits:
-            for value in range(1, 14):  
-                self.cards.append(Card(suit, value))
+        for _ in range(decks):
+            for suit in suits:
+                for value in range(1, 14):  
+                    self.cards.append(Card(suit, value))
                 
-    def shuffle(self):
-        #tasowanie kart
-        random.shuffle(self.cards)
+    def shuffle(self, seed=None):
+        #tasowanie kart, z podanym ziarnem rozdanie jest powtarzalne (jak klondike.shuffled_order)
+        if seed is None:
+            random.shuffle(self.cards)
+        else:
+            random.Random(seed).shuffle(self.cards)
         
     def deal(self):
         #rozdawanie kart
@@ -102,15 +207,19 @@ class Deck:
         return None
 
 class GameBoard:
-    def __init__(self):
-        self.tableau_piles = [[] for _ in range(7)]  #7 stosow glownych
-        self.foundation_piles = [[] for _ in range(4)]  #4 stosy docelowe
+    def __init__(self, decks=1, draw_count=1):
+        self.decks = decks
+        self.draw_count = draw_count  #liczba kart odkrywanych naraz ze stosu dobierania (1 albo 3)
+        self.tableau_piles = [[] for _ in range(TABLEAU_COUNT[decks])]  #7 stosow glownych (9 przy dwoch taliach)
+        #4 stosy docelowe; przy dwoch taliach 8, a stos i przyjmuje tylko kolor SUITS[i % 4]
+        self.foundation_piles = [[] for _ in range(4 * decks)]
         self.stock_pile = []  #stos kart do dobierania
         self.waste_pile = []  #stos odrzuconych kart
+        self.unverified = False  #rozdanie z trybu winnable_only, dla ktorego solver nie zdazyl znalezc rozwiazania
         
     def deal_initial_cards(self, deck):
         #rozdanie poczatkowych kart do stosow
-        for i in range(7):
+        for i in range(len(self.tableau_piles)):
             for j in range(i + 1):
                 card = deck.deal()
                 if j == i:
@@ -122,39 +231,42 @@ class GameBoard:
             self.stock_pile.append(deck.deal())
             
     def draw(self, surface):
-        #obliczenie pozycji startowej dla stosow glownych
-        total_tableau_width = 7 * (CARD_WIDTH + PILE_SPACING) - PILE_SPACING
-        start_x = (WINDOW_WIDTH - total_tableau_width) // 2
-        
+        #rysowane sa tylko stosy przecinajace obszar obciecia - przy czesciowym odswiezaniu
+        #koszt zalezy od liczby zmienionych stosow, a nie od liczby kart na planszy
+        clip = surface.get_clip()
+
         #rysowanie stosow glownych
         for i, pile in enumerate(self.tableau_piles):
-            x = start_x + i * (CARD_WIDTH + PILE_SPACING)
+            if not clip.colliderect(layout.tableau_rect(i, len(pile))):
+                continue
             for j, card in enumerate(pile):
-                y = int(WINDOW_HEIGHT * 0.3) + j * CARD_SPACING
-                card.draw(surface, x, y)
+                card.draw(surface, *layout.tableau_pos(i, j))
         
-        #rysowanie stosow docelowych
-        foundation_start_x = int(WINDOW_WIDTH * 0.1)
-        for i, pile in enumerate(self.foundation_piles):
-            x = foundation_start_x + i * (CARD_WIDTH + PILE_SPACING)
+        #rysowanie stosow docelowych, dobierania i odrzuconych kart
+        top_row = [(('foundation', i), pile) for i, pile in enumerate(self.foundation_piles)]
+        top_row += [(('stock', None), self.stock_pile)]
+        for key, pile in top_row:
+            rect = layout.slot_rect(key)
+            if not clip.colliderect(rect):
+                continue
             if pile:
-                pile[-1].draw(surface, x, int(WINDOW_HEIGHT * 0.05))
+                pile[-1].draw(surface, rect.x, rect.y)
             else:
-                pygame.draw.rect(surface, WHITE, (x, int(WINDOW_HEIGHT * 0.05), CARD_WIDTH, CARD_HEIGHT), 2)
-        
-        #rysowanie stosu dobierania
-        stock_x = int(WINDOW_WIDTH * 0.8)
-        if self.stock_pile:
-            self.stock_pile[-1].draw(surface, stock_x, int(WINDOW_HEIGHT * 0.05))
-        else:
-            pygame.draw.rect(surface, WHITE, (stock_x, int(WINDOW_HEIGHT * 0.05), CARD_WIDTH, CARD_HEIGHT), 2)
-        
-        #rysowanie stosu odrzuconych kart
-        waste_x = stock_x - CARD_WIDTH - PILE_SPACING
-        if self.waste_pile:
-            self.waste_pile[-1].draw(surface, waste_x, int(WINDOW_HEIGHT * 0.05))
-        else:
-            pygame.draw.rect(surface, WHITE, (waste_x, int(WINDOW_HEIGHT * 0.05), CARD_WIDTH, CARD_HEIGHT), 2)
+                draw_outline(surface, WHITE, rect, 2)
+                if key[0] == 'foundation' and self.decks > 1:
+                    #staly kolor stosu docelowego przy dwoch taliach
+                    label = render_text(SUITS[key[1] % 4][0].upper(), 48, WHITE)
+                    surface.blit(label, label.get_rect(center=rect.center))
+
+        #przy dobieraniu po trzy karty widac do trzech ostatnich kart, wierzchnia na miejscu stosu
+        rect = layout.waste_rect(self.draw_count)
+        if clip.colliderect(rect):
+            visible = self.waste_pile[-self.draw_count:]
+            if visible:
+                for k, card in enumerate(visible):
+                    card.draw(surface, *layout.waste_pos(k, len(visible)))
+            else:
+                draw_outline(surface, WHITE, layout.slot_rect(('waste', None)), 2)
 
 
 def is_opposite_color(card1, card2):
@@ -171,6 +283,12 @@ def can_move_to_foundation(card, pile):
     top = pile[-1]
     return card.suit == top.suit and card.value == top.value + 1
 
+def foundation_accepts(game_board, index, card):
+    #jak can_move_to_foundation, ale przy dwoch taliach stos przyjmuje tylko swoj kolor
+    if game_board.decks > 1 and SUITS[index % 4] != card.suit:
+        return False
+    return can_move_to_foundation(card, game_board.foundation_piles[index])
+
 
 def serialize_pile(pile):
     #konwersja stosu kart na format do zapisu
@@ -187,13 +305,14 @@ def serialize_game_board(game_board, picked_cards, picked_from):
         'foundation_piles': [serialize_pile(pile) for pile in game_board.foundation_piles],
         'stock_pile': serialize_pile(game_board.stock_pile),
         'waste_pile': serialize_pile(game_board.waste_pile),
+        'draw_count': game_board.draw_count,
         'picked_cards': [],
         'picked_from': None
     }
 
 def deserialize_game_board(data):
-    #wczytanie stanu gry
-    gb = GameBoard()
+    #wczytanie stanu gry (liczba talii wynika z liczby stosow docelowych)
+    gb = GameBoard(len(data['foundation_piles']) // 4, data.get('draw_count', 1))
     gb.tableau_piles = []
     for pile_data in data['tableau_piles']:
         pile = []
@@ -224,18 +343,330 @@ def deserialize_game_board(data):
     picked_from = None
     return gb, picked_cards, picked_from
 
-def draw_menu(screen, font, WINDOW_WIDTH, WINDOW_HEIGHT):
-    screen.fill((0, 128, 0))
-    title_font = pygame.font.SysFont(None, 80)
-    title = title_font.render('Solitaire', True, (255, 255, 255))
+def compact_game_board(game_board):
+    #zwarta kopia planszy (ok. 65 bajtow) - do solverow i przechowywania wielu stanow
+    return CompactBoard.from_game_board(game_board)
+
+def game_board_from_compact(board, draw_count=1):
+    #odbudowa planszy z obiektami Card (obrazy z bufora, bez odczytu z dysku)
+    data = board.to_serialized()
+    data['draw_count'] = draw_count
+    gb, picked_cards, picked_from = deserialize_game_board(data)
+    return gb
+
+
+def get_pile(game_board, key):
+    #zwrocenie stosu wskazanego kluczem ('tableau', i), ('foundation', i), ('waste', None) lub ('stock', None)
+    kind, index = key
+    if kind == 'tableau':
+        return game_board.tableau_piles[index]
+    if kind == 'foundation':
+        return game_board.foundation_piles[index]
+    if kind == 'waste':
+        return game_board.waste_pile
+    return game_board.stock_pile
+
+class UndoLog:
+    #dziennik ruchow do cofania - zamiast kopii calej planszy kazdy ruch to
+    #krotka (stos zrodlowy, stos docelowy, liczba kart, czy odkryto karte pod spodem, ruch silnika)
+    #history to pelny przebieg gry jako ruchy silnika klondike i cofniecia (UNDO) - do zapisu powtorki
+    #hints to generator ruchow podpowiedzi na stanie silnika odpowiadajacym planszy - budowany przy
+    #podpowiedzi (compute_hint), potem dostaje kazdy zapisany i cofniety ruch silnika; hints_from to
+    #liczba wpisow dziennika w chwili zbudowania (starszych ruchow generator nie umie cofnac)
+    def __init__(self):
+        self.entries = []
+        self.history = []
+        self.hints = None
+        self.hints_from = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries = []
+        self.history = []
+        self.hints = None
+
+    def record(self, src, dst, count, flipped=False, move=None):
+        self.entries.append((src, dst, count, flipped, move))
+        if move is not None:
+            self.history.append(move)
+            if self.hints is not None:
+                self.hints.apply(move)
+
+    def undo(self, game_board):
+        #cofniecie ostatniego ruchu, koszt proporcjonalny do liczby przeniesionych kart
+        if not self.entries:
+            return None
+        src, dst, count, flipped, move = self.entries.pop()
+        if move is not None:
+            self.history.append(UNDO)
+        if self.hints is not None:
+            if len(self.entries) < self.hints_from:
+                self.hints = None
+            elif move is not None:
+                self.hints.undo(move)
+        src_pile = get_pile(game_board, src)
+        dst_pile = get_pile(game_board, dst)
+        if src[0] == 'stock' or dst[0] == 'stock':
+            #karty miedzy stosem dobierania a odrzuconymi przechodza pojedynczo i sa odwracane
+            for _ in range(count):
+                card = dst_pile.pop()
+                card.face_up = src[0] != 'stock'
+                src_pile.append(card)
+        else:
+            moved = dst_pile[-count:]
+            del dst_pile[-count:]
+            if flipped:
+                src_pile[-1].face_up = False
+            src_pile.extend(moved)
+        return src, dst, count, flipped
+
+def complete_move(game_board, picked_cards, picked_from, dst, undo_log):
+    #polozenie podniesionych kart na stosie docelowym i zapis ruchu w dzienniku
+    src = picked_from[:2]
+    get_pile(game_board, dst).extend(picked_cards)
+    if src == dst:
+        return
+    flipped = False
+    if src[0] == 'tableau':
+        src_pile = game_board.tableau_piles[src[1]]
+        if src_pile and not src_pile[-1].face_up:
+            src_pile[-1].face_up = True
+            flipped = True
+    undo_log.record(src, dst, len(picked_cards), flipped, engine_move(game_board, src, dst, len(picked_cards)))
+
+def engine_move(game_board, src, dst, count):
+    #ruch silnika klondike odpowiadajacy wykonanemu juz przeniesieniu kart na planszy;
+    #przy jednej talii stosy docelowe sa w silniku indeksowane kolorem, przeniesienie miedzy nimi
+    #nic w nim nie zmienia (przy dwoch taliach resolve_drop na nie nie pozwala)
+    dst_pile = get_pile(game_board, dst)
+    if src[0] == 'foundation':
+        if dst[0] == 'foundation':
+            return None
+        return (FOUNDATION_TO_TABLEAU, engine_foundation(game_board, src[1], dst_pile[-1]), dst[1], 1)
+    if dst[0] == 'foundation':
+        f = engine_foundation(game_board, dst[1], dst_pile[-1])
+        if src[0] == 'waste':
+            return (WASTE_TO_FOUNDATION, None, f, 1)
+        return (TABLEAU_TO_FOUNDATION, src[1], f, 1)
+    if src[0] == 'waste':
+        return (WASTE_TO_TABLEAU, None, dst[1], 1)
+    return (TABLEAU_TO_TABLEAU, src[1], dst[1], count)
+
+def foundation_slot(game_board, suit):
+    #stos docelowy dla koloru: ten z kartami tego koloru albo pierwszy pusty
+    empty = None
+    for i, pile in enumerate(game_board.foundation_piles):
+        if pile and pile[-1].suit == suit:
+            return i
+        if not pile and empty is None:
+            empty = i
+    return empty
+
+def engine_foundation(game_board, index, card):
+    #indeks w silniku stosu docelowego planszy, na ktorym lezy (albo lezala) karta
+    return SUIT_INDEX[card.suit] if game_board.decks == 1 else index
+
+def board_foundation(game_board, f):
+    #indeks stosu docelowego planszy dla stosu f z silnika
+    return foundation_slot(game_board, SUITS[f]) if game_board.decks == 1 else f
+
+def apply_engine_move(game_board, move, undo_log):
+    #wykonanie ruchu z klondike.KlondikeState na planszy z obiektami Card
+    kind, src, dst, count = move
+    if kind == DRAW:
+        for _ in range(count):
+            card = game_board.stock_pile.pop()
+            card.face_up = True
+            game_board.waste_pile.append(card)
+        undo_log.record(('stock', None), ('waste', None), count, move=move)
+        return
+    if kind == RECYCLE:
+        undo_log.record(('waste', None), ('stock', None), len(game_board.waste_pile), move=move)
+        while game_board.waste_pile:
+            card = game_board.waste_pile.pop()
+            card.face_up = False
+            game_board.stock_pile.append(card)
+        return
+    if kind in (WASTE_TO_FOUNDATION, WASTE_TO_TABLEAU):
+        picked_from = ('waste', None)
+        picked_cards = [game_board.waste_pile.pop()]
+    elif kind == FOUNDATION_TO_TABLEAU:
+        picked_from = ('foundation', board_foundation(game_board, src))
+        picked_cards = [game_board.foundation_piles[picked_from[1]].pop()]
+    else:
+        pile = game_board.tableau_piles[src]
+        picked_from = ('tableau', src, len(pile) - count)
+        picked_cards = pile[-count:]
+        game_board.tableau_piles[src] = pile[:-count]
+    if kind in (WASTE_TO_FOUNDATION, TABLEAU_TO_FOUNDATION):
+        dst_key = ('foundation', board_foundation(game_board, dst))
+    else:
+        dst_key = ('tableau', dst)
+    complete_move(game_board, picked_cards, picked_from, dst_key, undo_log)
+
+def lift_for_flight(game_board, move):
+    #zdjecie karty do animowanego przelotu na stos docelowy (ruch na stos docelowy z silnika)
+    kind, src, dst, count = move
+    if kind == WASTE_TO_FOUNDATION:
+        src_key = ('waste', None)
+        start = layout.slot_rect(src_key).topleft
+        card = game_board.waste_pile.pop()
+    else:
+        src_key = ('tableau', src)
+        pile = game_board.tableau_piles[src]
+        start = layout.tableau_pos(src, len(pile) - 1)
+        card = pile.pop()
+    dst_key = ('foundation', board_foundation(game_board, dst))
+    end = layout.slot_rect(dst_key).topleft
+    return {'card': card, 'src': src_key, 'dst': dst_key, 'start': start, 'end': end, 'frame': 0}
+
+def flight_pos(flight):
+    t = flight['frame'] / AUTOFINISH_FRAMES
+    (x0, y0), (x1, y1) = flight['start'], flight['end']
+    return int(x0 + (x1 - x0) * t), int(y0 + (y1 - y0) * t)
+
+def hint_rects(game_board, move):
+    #obramowania dla ruchu z podpowiedzi: karty zrodlowe i miejsce docelowe
+    kind, src, dst, count = move
+    if kind in (DRAW, RECYCLE):
+        return [layout.slot_rect(('stock', None))]
+    if kind in (WASTE_TO_FOUNDATION, WASTE_TO_TABLEAU):
+        rects = [layout.slot_rect(('waste', None))]
+    elif kind == FOUNDATION_TO_TABLEAU:
+        rects = [layout.slot_rect(('foundation', board_foundation(game_board, src)))]
+    else:
+        size = len(game_board.tableau_piles[src])
+        x, y = layout.tableau_pos(src, size - count)
+        rects = [pygame.Rect(x, y, CARD_WIDTH, CARD_HEIGHT + (count - 1) * CARD_SPACING)]
+    if kind in (WASTE_TO_FOUNDATION, TABLEAU_TO_FOUNDATION):
+        rects.append(layout.slot_rect(('foundation', board_foundation(game_board, dst))))
+    else:
+        size = len(game_board.tableau_piles[dst])
+        rects.append(pygame.Rect(layout.tableau_pos(dst, max(size - 1, 0)), (CARD_WIDTH, CARD_HEIGHT)))
+    return rects
+
+def draw_profile_overlay(surface, lines):
+    #tekst zmienia sie co kilkadziesiat klatek, wiec nie trafia do bufora render_text
+    surface.fill((0, 0, 0), PROFILE_RECT)
+    font = get_font(22)
+    for i, line in enumerate(lines):
+        surface.blit(font.render(line, True, (0, 255, 0)), (PROFILE_RECT.x + 8, PROFILE_RECT.y + 6 + i * 20))
+
+def compute_hint(game_board, undo_log, difficulty):
+    #prostokaty do podswietlenia dla najlepszego ruchu (pusta lista, gdy ruchu nie ma);
+    #plansza nie moze miec podniesionych kart
+    if undo_log.hints is None:
+        state = KlondikeState.from_serialized(serialize_game_board(game_board, [], None),
+                                              draw_count=game_board.draw_count)
+        undo_log.hints = MoveGenerator(state)
+        undo_log.hints_from = len(undo_log.entries)
+    undo_log.hints.state.foundation_to_tableau = difficulty == 'beginner'
+    move = search_hint(undo_log.hints)
+    return hint_rects(game_board, move) if move is not None else []
+
+def return_picked_cards(game_board, picked_cards, picked_from):
+    #zwrocenie podniesionych kart na miejsce startowe
+    if picked_from[0] == 'waste':
+        picked_cards[0].face_up = True
+    get_pile(game_board, picked_from[:2]).extend(picked_cards)
+
+def new_seed():
+    return random.getrandbits(32)
+
+def deal_new_game(winnable_only=False, seed=None, decks=1, draw_count=1):
+    #nowe rozdanie z ziarnem (losowym, jesli nie podano) - zwraca plansze i ziarno, z ktorego
+    #rozdanie mozna odtworzyc; w trybie winnable_only losujemy kolejne ziarna, az solver znajdzie
+    #rozwiazanie (albo skonczy sie czas - wtedy zostaje ostatnie rozdanie z flaga unverified)
+    #wymiary kart musza juz odpowiadac liczbie talii (set_geometry)
+    unverified = False
+    if seed is None:
+        seed = new_seed()
+        if winnable_only:
+            deadline = time.perf_counter() + WINNABLE_DEAL_TIME[decks]
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    unverified = True
+                    break
+                result = solve(KlondikeState.deal(shuffled_order(seed, decks), draw_count=draw_count),
+                               max_nodes=WINNABLE_SOLVE_NODES[decks], time_limit=remaining)
+                if result.status == 'solvable':
+                    break
+                seed = new_seed()
+    deck = Deck(decks)
+    deck.shuffle(seed)
+    game_board = GameBoard(decks, draw_count)
+    game_board.deal_initial_cards(deck)
+    game_board.unverified = unverified
+    return game_board, seed
+
+def replay_flags(difficulty, game_won, draw_count, decks):
+    flags = (FOUNDATION_TO_TABLEAU_FLAG if difficulty == 'beginner' else 0) | (WON_FLAG if game_won else 0)
+    return flags | variant_flags(draw_count, decks)
+
+def save_replay(seed, difficulty, undo_log, game_won, game_board):
+    #dopisanie zakonczonej gry do pliku powtorek (pomijane, gdy nie wykonano zadnego ruchu)
+    if not undo_log.history:
+        return
+    flags = replay_flags(difficulty, game_won, game_board.draw_count, game_board.decks)
+    try:
+        append_replay(REPLAY_PATH, Replay(seed, flags, undo_log.history))
+    except OSError:
+        pass
+
+def autosave(game_board, seed, difficulty, undo_log, elapsed_ms):
+    #zapis biezacej gry po kazdym ruchu - kilkaset bajtow bez obrazow kart, wiec nie zatrzymuje klatki
+    saved = SavedGame(compact_game_board(game_board), difficulty, game_board.draw_count, game_board.decks,
+                      elapsed_ms, seed, undo_log.history)
+    try:
+        save_game(SAVE_PATH, saved)
+    except OSError:
+        pass
+
+def load_saved_game():
+    #gra zapisana przy poprzednim uruchomieniu albo None (takze gdy plik jest uszkodzony)
+    try:
+        return load_game(SAVE_PATH)
+    except (OSError, ValueError):
+        return None
+
+def discard_saved_game(saved):
+    #zapisana gra nie zostanie wznowiona - jej przebieg trafia do pliku powtorek, plik zapisu jest usuwany
+    if saved.history:
+        flags = replay_flags(saved.difficulty, False, saved.draw_count, saved.decks)
+        try:
+            append_replay(REPLAY_PATH, Replay(saved.seed, flags, saved.history))
+        except OSError:
+            pass
+    delete_game(SAVE_PATH)
+
+@lru_cache(maxsize=None)
+def get_font(size):
+    #czcionki sa tworzone raz dla kazdego rozmiaru
+    return pygame.font.SysFont(None, size)
+
+@lru_cache(maxsize=256)
+def render_text(text, size, color):
+    #bufor wyrenderowanych napisow (klucz: tekst, rozmiar czcionki, kolor), najdawniej uzywane sa usuwane
+    #zwracana powierzchnia jest wspolna - mozna ja tylko rysowac
+    return get_font(size).render(text, True, color)
+
+#ostatnio narysowane menu: (klucz, powierzchnia, przyciski), klucz: (szerokosc, wysokosc, winnable_only,
+#draw_count, decks, can_resume); tylko jedno, bo kazda powierzchnia ma rozmiar calego okna
+_menu_cache = None
+
+def render_menu(WINDOW_WIDTH, WINDOW_HEIGHT, winnable_only, draw_count=1, decks=1, can_resume=False):
+    surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT)).convert()
+    surface.fill((0, 128, 0))
+    title = render_text('Solitaire', 80, (255, 255, 255))
     title_rect = title.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 6))
-    screen.blit(title, title_rect)
+    surface.blit(title, title_rect)
 
-    label_font = pygame.font.SysFont(None, 40)
-    label = label_font.render('Difficulty level:', True, (255, 255, 255))
+    label = render_text('Difficulty level:', 40, (255, 255, 255))
     label_rect = label.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 3))
-    screen.blit(label, label_rect)
-    button_font = pygame.font.SysFont(None, 48)
+    surface.blit(label, label_rect)
     buttons = [
         ('Beginner', (0, 200, 0)),
         ('Medium', (200, 200, 0)),
@@ -244,14 +675,235 @@ def draw_menu(screen, font, WINDOW_WIDTH, WINDOW_HEIGHT):
     button_rects = []
     for i, (label, color) in enumerate(buttons):
         rect = pygame.Rect(WINDOW_WIDTH // 2 - 120, WINDOW_HEIGHT // 3 + 50 + i * 80, 240, 60)
-        pygame.draw.rect(screen, color, rect)
-        text = button_font.render(label, True, (0, 0, 0))
+        pygame.draw.rect(surface, color, rect)
+        text = render_text(label, 48, (0, 0, 0))
         text_rect = text.get_rect(center=rect.center)
-        screen.blit(text, text_rect)
+        surface.blit(text, text_rect)
+        button_rects.append(rect)
+
+    #przelacznik rozdan z gwarantowanym rozwiazaniem
+    rect = pygame.Rect(WINDOW_WIDTH // 2 - 160, WINDOW_HEIGHT // 3 + 50 + len(buttons) * 80 + 20, 320, 50)
+    pygame.draw.rect(surface, (200, 200, 200), rect)
+    text = render_text(f"Winnable deals only: {'ON' if winnable_only else 'OFF'}", 36, (0, 0, 0))
+    text_rect = text.get_rect(center=rect.center)
+    surface.blit(text, text_rect)
+    button_rects.append(rect)
+
+    #przelaczniki wariantu: liczba dobieranych kart i liczba talii
+    variants = [f"Draw {draw_count} card{'s' if draw_count > 1 else ''}", f"Decks: {decks}"]
+    for i, label in enumerate(variants):
+        rect = pygame.Rect(WINDOW_WIDTH // 2 - 250 + i * 260, WINDOW_HEIGHT // 3 + 50 + len(buttons) * 80 + 90, 240, 50)
+        pygame.draw.rect(surface, (200, 200, 200), rect)
+        text = render_text(label, 36, (0, 0, 0))
+        surface.blit(text, text.get_rect(center=rect.center))
+        button_rects.append(rect)
+
+    #powrot do przerwanej gry (biezacej albo zapisanej przy poprzednim uruchomieniu)
+    if can_resume:
+        rect = pygame.Rect(WINDOW_WIDTH // 2 - 120, WINDOW_HEIGHT // 6 + 50, 240, 45)
+        pygame.draw.rect(surface, (180, 220, 180), rect)
+        text = render_text('Resume', 40, (0, 0, 0))
+        surface.blit(text, text.get_rect(center=rect.center))
         button_rects.append(rect)
+    return surface, button_rects
+
+def draw_menu(screen, font, WINDOW_WIDTH, WINDOW_HEIGHT, winnable_only=False, draw_count=1, decks=1,
+              can_resume=False):
+    global _menu_cache
+    key = (WINDOW_WIDTH, WINDOW_HEIGHT, winnable_only, draw_count, decks, can_resume)
+    if _menu_cache is None or _menu_cache[0] != key:
+        _menu_cache = (key, *render_menu(WINDOW_WIDTH, WINDOW_HEIGHT, winnable_only, draw_count, decks, can_resume))
+    _, surface, button_rects = _menu_cache
+    screen.blit(surface, (0, 0))
     pygame.display.flip()
     return button_rects
 
+def pile_signature(pile):
+    #zawartosc stosu glownego - zmiana sygnatury oznacza koniecznosc przerysowania
+    return tuple((id(card), card.face_up) for card in pile)
+
+def top_signature(pile, count=1):
+    #na stosach docelowych i dobierania widac tylko wierzchnia karte, na odrzuconych do count kart
+    if not pile:
+        return None
+    if count > 1:
+        return tuple(id(card) for card in pile[-count:])
+    return id(pile[-1]), pile[-1].face_up
+
+class BoardLayout:
+    #indeks polozenia stosow na ekranie: kolumny stosow glownych maja stala szerokosc i odstep,
+    #a karty w kolumnie sa przesuniete o CARD_SPACING, wiec klikniecie zamienia sie na
+    #(stos, indeks karty) dzieleniem zamiast sprawdzania kazdej karty
+    def __init__(self, tableau_count=7, foundation_count=4):
+        self.tableau_count = tableau_count
+        self.foundation_count = foundation_count
+        self.pitch = CARD_WIDTH + PILE_SPACING
+        total_tableau_width = tableau_count * self.pitch - PILE_SPACING
+        self.tableau_x = (WINDOW_WIDTH - total_tableau_width) // 2
+        self.tableau_y = int(WINDOW_HEIGHT * 0.3)
+        self.top_y = int(WINDOW_HEIGHT * 0.05)
+        #8 stosow docelowych zaczyna sie blizej krawedzi, zeby zmiescily sie obok odrzuconych kart
+        self.foundation_x = int(WINDOW_WIDTH * (0.1 if foundation_count == 4 else 0.05))
+        self.stock_x = int(WINDOW_WIDTH * 0.8)
+        self.waste_x = self.stock_x - CARD_WIDTH - PILE_SPACING
+
+    def tableau_pos(self, i, j=0):
+        return self.tableau_x + i * self.pitch, self.tableau_y + j * CARD_SPACING
+
+    def slot_rect(self, key):
+        #prostokat stosu z gornego rzedu (docelowy, dobierania, odrzuconych)
+        kind, index = key
+        if kind == 'foundation':
+            x = self.foundation_x + index * self.pitch
+        elif kind == 'stock':
+            x = self.stock_x
+        else:
+            x = self.waste_x
+        return pygame.Rect(x, self.top_y, CARD_WIDTH, CARD_HEIGHT)
+
+    def waste_pos(self, k, visible):
+        #polozenie k-tej z visible odkrytych kart odrzuconych - wierzchnia lezy na miejscu stosu,
+        #wczesniejsze wystaja w lewo o CARD_SPACING
+        return self.waste_x - (visible - 1 - k) * CARD_SPACING, self.top_y
+
+    def waste_rect(self, draw_count=1):
+        #obszar stosu odrzuconych razem z wachlarzem przy dobieraniu po kilka kart
+        spread = (draw_count - 1) * CARD_SPACING
+        return pygame.Rect(self.waste_x - spread, self.top_y, CARD_WIDTH + spread, CARD_HEIGHT)
+
+    def tableau_rect(self, i, size):
+        x, y = self.tableau_pos(i)
+        return pygame.Rect(x, y, CARD_WIDTH, CARD_HEIGHT + max(size - 1, 0) * CARD_SPACING)
+
+    def hit_top_row(self, x, y):
+        #klucz stosu z gornego rzedu pod punktem albo None
+        if not self.top_y <= y < self.top_y + CARD_HEIGHT:
+            return None
+        if self.stock_x <= x < self.stock_x + CARD_WIDTH:
+            return ('stock', None)
+        if self.waste_x <= x < self.waste_x + CARD_WIDTH:
+            return ('waste', None)
+        offset = x - self.foundation_x
+        i = offset // self.pitch
+        if offset >= 0 and i < self.foundation_count and offset - i * self.pitch < CARD_WIDTH:
+            return ('foundation', i)
+        return None
+
+    def hit_tableau(self, game_board, x, y):
+        #(stos, indeks karty) pod punktem, (stos, None) dla pustego stosu albo None
+        offset = x - self.tableau_x
+        i = offset // self.pitch
+        if offset < 0 or i >= self.tableau_count or offset - i * self.pitch >= CARD_WIDTH or y < self.tableau_y:
+            return None
+        pile = game_board.tableau_piles[i]
+        if not pile:
+            return (i, None) if y < self.tableau_y + CARD_HEIGHT else None
+        #wszystkie karty poza ostatnia sa widoczne tylko na pasku wysokosci CARD_SPACING
+        j = min((y - self.tableau_y) // CARD_SPACING, len(pile) - 1)
+        if y >= self.tableau_y + j * CARD_SPACING + CARD_HEIGHT:
+            return None
+        return i, j
+
+    def resolve_drop(self, game_board, picked_cards, x, y, picked_from=None):
+        #stos docelowy dla upuszczanych kart, jesli ruch jest dozwolony; przy dwoch taliach karty
+        #nie mozna przelozyc na drugi stos docelowy tego samego koloru (silnik nie ma takiego ruchu)
+        card = picked_cards[0]
+        slot = self.hit_top_row(x, y)
+        if slot is not None and slot[0] == 'foundation':
+            if game_board.decks > 1 and picked_from is not None and picked_from[0] == 'foundation':
+                return None
+            if len(picked_cards) == 1 and foundation_accepts(game_board, slot[1], card):
+                return slot
+            return None
+        hit = self.hit_tableau(game_board, x, y)
+        if hit is None:
+            return None
+        i, j = hit
+        pile = game_board.tableau_piles[i]
+        if j is None:
+            #krol z samego spodu stosu na pusty stos nic nie zmienia - silnik nie ma takiego ruchu
+            if picked_from is not None and picked_from[0] == 'tableau' and picked_from[2] == 0:
+                return None
+            return ('tableau', i) if card.value == 13 else None
+        top_card = pile[-1]
+        if pile[j].face_up and is_opposite_color(card, top_card) and card.value == top_card.value - 1:
+            return ('tableau', i)
+        return None
+
+def board_regions(game_board):
+    #fragmenty ekranu zajmowane przez stosy razem z sygnatura ich zawartosci
+    for i, pile in enumerate(game_board.tableau_piles):
+        yield ('tableau', i), pile_signature(pile), layout.tableau_rect(i, len(pile))
+    for i, pile in enumerate(game_board.foundation_piles):
+        yield ('foundation', i), top_signature(pile), layout.slot_rect(('foundation', i))
+    yield ('stock', None), top_signature(game_board.stock_pile), layout.slot_rect(('stock', None))
+    count = game_board.draw_count
+    yield ('waste', None), top_signature(game_board.waste_pile, count), layout.waste_rect(count)
+
+def foundation_highlights(game_board, picked_cards):
+    #stosy docelowe, na ktore mozna polozyc pojedyncza podniesiona karte
+    if len(picked_cards) != 1:
+        return []
+    return [layout.slot_rect(('foundation', i)) for i in range(len(game_board.foundation_piles))
+            if foundation_accepts(game_board, i, picked_cards[0])]
+
+class DirtyRenderer:
+    #odswiezanie tylko zmienionych fragmentow ekranu - tlo jest odtwarzane z gotowej powierzchni,
+    #scena rysowana z obcieciem do fragmentu, a na ekran trafia display.update(rects)
+    MAX_RECTS = 8  #powyzej tej liczby fragmenty sa laczone w jeden prostokat
+
+    def __init__(self, surface, background):
+        self.surface = surface
+        self.background = background
+        self.regions = {}  #klucz -> (sygnatura, prostokat)
+        self.dirty = []
+        self.full = True
+
+    def invalidate(self):
+        #przerysowanie calego ekranu w nastepnej klatce
+        self.full = True
+
+    def mark(self, rect):
+        self.dirty.append(pygame.Rect(rect))
+
+    def track(self, key, signature, rect):
+        #oznaczenie regionu do przerysowania, gdy zmienila sie jego zawartosc lub polozenie
+        old = self.regions.get(key)
+        if old is not None and old[0] == signature and old[1] == rect:
+            return
+        if old is not None:
+            self.dirty.append(old[1])
+        self.dirty.append(pygame.Rect(rect))
+        self.regions[key] = (signature, pygame.Rect(rect))
+
+    def render(self, draw_scene):
+        surface = self.surface
+        if self.full:
+            with profiler.phase('blit'):
+                surface.blit(self.background, (0, 0))
+            draw_scene(surface)
+            with profiler.phase('flip'):
+                pygame.display.flip()
+            self.full = False
+            self.dirty = []
+            return
+        screen_rect = surface.get_rect()
+        rects = [rect.clip(screen_rect) for rect in self.dirty]
+        rects = [rect for rect in rects if rect.width and rect.height]
+        self.dirty = []
+        if not rects:
+            return
+        if len(rects) > self.MAX_RECTS:
+            rects = [rects[0].unionall(rects[1:])]
+        for rect in rects:
+            surface.set_clip(rect)
+            with profiler.phase('blit'):
+                surface.blit(self.background, rect, rect)
+            draw_scene(surface)
+        surface.set_clip(None)
+        with profiler.phase('flip'):
+            pygame.display.update(rects)
+
 def is_game_won(game_board):
     return all(len(pile) == 13 for pile in game_board.foundation_piles)
 
@@ -263,27 +915,158 @@ def all_tableau_face_up(game_board):
     return True
 
 def main():
+    #okno i menu od razu, tlo i karty wczytywane w tle w czasie wyboru poziomu
+    init_display()
+    start_asset_loading()
 
-    deck = Deck()
-    deck.shuffle()
+    winnable_only = False
+    draw_count = 1  #wariant wybrany w menu, obowiazuje od nastepnego rozdania
+    decks = 1
     game_board = GameBoard()
-    game_board.deal_initial_cards(deck)
+    seed = None
+    saved_game = load_saved_game()  #gra przerwana przy poprzednim uruchomieniu
+    autosaved = 0  #dlugosc przebiegu gry przy ostatnim zapisie
 
     picked_cards = []
     picked_from = None
-    history = [] 
-    font = pygame.font.SysFont(None, 36)
+    undo_log = UndoLog()
+    font = get_font(36)
     game_state = 'menu' 
     difficulty = None
     running = True
     game_won = False
     start_ticks = pygame.time.get_ticks()
     final_time = None
+    timer_label = ''
+    autofinish_rect = None
+    autofinish_queue = deque()
+    flight = None
+    hint = []  #obramowania ruchu z podpowiedzi, znikaja przy kolejnym kliknieciu
+    show_profile = profiler.enabled
+    renderer = None  #tworzony przy pierwszej grze, gdy tlo jest juz wczytane
+    menu_dirty = True
+    waited = []  #zdarzenie, ktore obudzilo bezczynna petle
+
+    def draw_scene(surface):
+        #rysowanie calej sceny gry; przy czesciowym odswiezaniu obcinane do zmienionego fragmentu
+        with profiler.phase('board'):
+            game_board.draw(surface)
+
+        with profiler.phase('text'):
+            newgame_rect = pygame.Rect(20, WINDOW_HEIGHT - 70, 140, 50)
+            pygame.draw.rect(surface, (200, 200, 200), newgame_rect)
+            text = render_text('New Game', 36, (0, 0, 0))
+            text_rect = text.get_rect(center=newgame_rect.center)
+            surface.blit(text, text_rect)
+  
+            #wyswietlanie timera
+            if not game_won:
+                timer_text = render_text(timer_label, 36, (255, 255, 255))
+                surface.blit(timer_text, TIMER_RECT.topleft)
+
+            if game_board.unverified:
+                unverified_text = render_text('Unverified deal', 30, (255, 210, 120))
+                surface.blit(unverified_text, UNVERIFIED_RECT.topleft)
+
+            #wyswietlanie poziomu trudnosci
+            if difficulty:
+                diff_label = render_text(f'Level: {difficulty.capitalize()}', 36, (255, 255, 255))
+                surface.blit(diff_label, (20, WINDOW_HEIGHT - 110))
+
+            #rysowanie przycisku cofnij ruch
+            if difficulty != 'expert':
+                return_rect = pygame.Rect(WINDOW_WIDTH - 160, 20, 140, 50)
+                pygame.draw.rect(surface, (200, 200, 200), return_rect)
+                text = render_text('Undo', 36, (0, 0, 0))
+                text_rect = text.get_rect(center=return_rect.center)
+                surface.blit(text, text_rect)
+
+                #przycisk podpowiedzi
+                pygame.draw.rect(surface, (200, 200, 200), HINT_RECT)
+                text = render_text('Hint', 36, (0, 0, 0))
+                surface.blit(text, text.get_rect(center=HINT_RECT.center))
+
+            #rysowanie przycisku powrotu do menu
+            if game_state == 'playing':
+                return_menu_rect = pygame.Rect(WINDOW_WIDTH // 2 - 80, WINDOW_HEIGHT - 100, 160, 60)
+                pygame.draw.rect(surface, (180, 180, 180), return_menu_rect)
+                return_menu_text = render_text('Return', 36, (0, 0, 0))
+                return_menu_text_rect = return_menu_text.get_rect(center=return_menu_rect.center)
+                surface.blit(return_menu_text, return_menu_text_rect)
+
+            #wyswietlanie przycisku auto-finish
+            if autofinish_rect:
+                pygame.draw.rect(surface, (180, 220, 180), autofinish_rect, border_radius=20)
+                autofinish_text = render_text('AUTO-FINISH', 60, (0, 0, 0))
+                autofinish_text_rect = autofinish_text.get_rect(center=autofinish_rect.center)
+                surface.blit(autofinish_text, autofinish_text_rect)
+
+        #podswietlenie ruchu z podpowiedzi
+        for rect in hint:
+            draw_outline(surface, HINT_COLOR, rect, 4)
+
+        with profiler.phase('drag'):
+            #rysowanie podnoszonych kart
+            if picked_cards:
+                mx, my = pygame.mouse.get_pos()
+     
+                #podswietlanie mozliwych miejsc docelowych
+                for pile_rect in foundation_highlights(game_board, picked_cards):
+                    draw_outline(surface, (255, 215, 0), pile_rect, 4)
+                #rysowanie podnoszonych kart
+                for idx, card in enumerate(picked_cards):
+                    card.draw(surface, mx - CARD_WIDTH // 2, my - CARD_HEIGHT // 2 + idx * CARD_SPACING)
+
+            #karta lecaca na stos docelowy
+            if flight is not None:
+                flight['card'].draw(surface, *flight_pos(flight))
+
+        with profiler.phase('text'):
+            if game_won:
+                #wyswietlanie ekranu wygranej
+                win_text = render_text('You Win!', 80, (255, 215, 0))
+                if final_time is not None:
+                    minutes = final_time // 60
+                    seconds = final_time % 60
+                    timer_text = render_text(f"Time: {minutes:02}:{seconds:02}", 48, (255, 255, 255))
+                else:
+                    timer_text = render_text("Time: 00:00", 48, (255, 255, 255))
+
+                spacing = 20
+                total_height = win_text.get_height() + spacing + timer_text.get_height()
+                box_width = max(win_text.get_width(), timer_text.get_width()) + 40
+                box_height = total_height + 40
+                box_rect = pygame.Rect(0, 0, box_width, box_height)
+                box_rect.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
+                pygame.draw.rect(surface, (0, 0, 0), box_rect)
+
+                win_text_rect = win_text.get_rect(center=(box_rect.centerx, box_rect.top + 20 + win_text.get_height() // 2))
+                surface.blit(win_text, win_text_rect)
+
+                timer_text_rect = timer_text.get_rect(center=(box_rect.centerx, win_text_rect.bottom + spacing + timer_text.get_height() // 2))
+                surface.blit(timer_text, timer_text_rect)
+
+        #nakladka z czasami klatek (tylko przy wlaczonym profilowaniu)
+        if show_profile:
+            draw_profile_overlay(surface, profiler.overlay_lines)
 
     while running:
+        profiler.begin_frame()
         if game_state == 'menu':
-            button_rects = draw_menu(screen, font, WINDOW_WIDTH, WINDOW_HEIGHT)
-            for event in pygame.event.get():
+            #menu jest statyczne - rysowane tylko po zmianie
+            if menu_dirty:
+                can_resume = saved_game is not None or (difficulty is not None and not game_won)
+                button_rects = draw_menu(screen, font, WINDOW_WIDTH, WINDOW_HEIGHT, winnable_only, draw_count, decks,
+                                         can_resume)
+                menu_dirty = False
+                if 'first_frame' not in profiler.marks:
+                    profiler.mark('first_frame')
+                    #reszta modulow pygame dopiero po pokazaniu menu
+                    pygame.init()
+            poll_asset_loading()
+            events = waited + pygame.event.get()
+            waited = []
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
@@ -294,46 +1077,114 @@ def main():
                     #wybor poziomu trudnosci
                     for i, rect in enumerate(button_rects):
                         if rect.collidepoint(mouse_x, mouse_y):
+                            if i == 3:
+                                winnable_only = not winnable_only
+                                menu_dirty = True
+                                break
+                            if i == 4:
+                                draw_count = 4 - draw_count  #1 <-> 3
+                                menu_dirty = True
+                                break
+                            if i == 5:
+                                decks = 3 - decks  #1 <-> 2
+                                menu_dirty = True
+                                break
+                            if i == 6:
+                                #wznowienie - zapisana gra jest wczytywana, biezaca po prostu trwa dalej
+                                if saved_game is not None:
+                                    if layout.foundation_count != 4 * saved_game.decks:
+                                        set_geometry(WINDOW_WIDTH, WINDOW_HEIGHT, saved_game.decks)
+                                    game_board = game_board_from_compact(saved_game.board, saved_game.draw_count)
+                                    difficulty = saved_game.difficulty
+                                    seed = saved_game.seed
+                                    #cofanie obejmuje ruchy od wznowienia, przebieg do powtorki jest pelny
+                                    undo_log.clear()
+                                    undo_log.history = list(saved_game.history)
+                                    autosaved = len(undo_log.history)
+                                    picked_cards = []
+                                    picked_from = None
+                                    autofinish_queue.clear()
+                                    flight = None
+                                    hint = []
+                                    start_ticks = pygame.time.get_ticks() - saved_game.elapsed_ms
+                                    final_time = None
+                                    game_won = False
+                                    saved_game = None
+                                game_state = 'playing'
+                                if renderer is None:
+                                    renderer = DirtyRenderer(screen, get_background())
+                                renderer.invalidate()
+                                break
+                            if saved_game is not None:
+                                discard_saved_game(saved_game)
+                                saved_game = None
+                            save_replay(seed, difficulty, undo_log, game_won, game_board)
+                            delete_game(SAVE_PATH)
                             if i == 0:
                                 difficulty = 'beginner'
                             elif i == 1:
                                 difficulty = 'medium'
                             elif i == 2:
                                 difficulty = 'expert'
-                            #reset gry po wyborze poziomu
-                            deck = Deck()
-                            deck.shuffle()
-                            game_board = GameBoard()
-                            game_board.deal_initial_cards(deck)
+                            #reset gry po wyborze poziomu (wymiary kart zaleza od liczby talii)
+                            if layout.foundation_count != 4 * decks:
+                                set_geometry(WINDOW_WIDTH, WINDOW_HEIGHT, decks)
+                            game_board, seed = deal_new_game(winnable_only, decks=decks, draw_count=draw_count)
                             picked_cards = []
                             picked_from = None
-                            history = []
+                            undo_log.clear()
+                            autosaved = 0
+                            autofinish_queue.clear()
+                            flight = None
+                            hint = []
                             start_ticks = pygame.time.get_ticks()
                             final_time = None
                             game_state = 'playing'
+                            if renderer is None:
+                                renderer = DirtyRenderer(screen, get_background())
+                            renderer.invalidate()
                             break
+            profiler.end_frame()
+            #dopoki zasoby sie wczytuja, menu sprawdza je co klatke; po wyjsciu nie ma na co czekac
+            waited = wait_for_frame(_asset_loader is not None or not running, IDLE_TIMEOUT)
             continue
 
         #obsluga zdarzen w grze
-        for event in pygame.event.get():
+        events_start = time.perf_counter()
+        events = waited + pygame.event.get()
+        waited = []
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
+                elif event.key == pygame.K_F3 and profiler.enabled:
+                    show_profile = not show_profile
+                elif (event.key == pygame.K_h and difficulty != 'expert' and not picked_cards
+                      and not autofinish_queue and flight is None):
+                    hint = compute_hint(game_board, undo_log, difficulty)
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 mouse_x, mouse_y = pygame.mouse.get_pos()
 
+                #w trakcie animacji auto-finish klikniecia sa ignorowane
+                if autofinish_queue or flight is not None:
+                    continue
+                hint = []
+
                 #przycisk nowej gry
                 newgame_rect = pygame.Rect(20, WINDOW_HEIGHT - 70, 140, 50)
                 if newgame_rect.collidepoint(mouse_x, mouse_y):
-                    deck = Deck()
-                    deck.shuffle()
-                    game_board = GameBoard()
-                    game_board.deal_initial_cards(deck)
+                    save_replay(seed, difficulty, undo_log, game_won, game_board)
+                    delete_game(SAVE_PATH)
+                    game_board, seed = deal_new_game(winnable_only, decks=game_board.decks,
+                                                     draw_count=game_board.draw_count)
                     picked_cards = []
                     picked_from = None
-                    history = []
+                    undo_log.clear()
+                    autosaved = 0
+                    autofinish_queue.clear()
+                    flight = None
                     start_ticks = pygame.time.get_ticks()
                     final_time = None
                     continue
@@ -342,8 +1193,22 @@ def main():
                 if difficulty != 'expert':
                     return_rect = pygame.Rect(WINDOW_WIDTH - 160, 20, 140, 50)
                     if return_rect.collidepoint(mouse_x, mouse_y):
-                        if history:
-                            game_board, picked_cards, picked_from = deserialize_game_board(history.pop())
+                        if picked_cards:
+                            #cofniecie podniesienia kart
+                            return_picked_cards(game_board, picked_cards, picked_from)
+                            picked_cards = []
+                            picked_from = None
+                        else:
+                            undo_log.undo(game_board)
+                        continue
+
+                    #przycisk podpowiedzi
+                    if HINT_RECT.collidepoint(mouse_x, mouse_y):
+                        if picked_cards:
+                            return_picked_cards(game_board, picked_cards, picked_from)
+                            picked_cards = []
+                            picked_from = None
+                        hint = compute_hint(game_board, undo_log, difficulty)
                         continue
 
                 #przycisk powrotu do menu
@@ -351,250 +1216,122 @@ def main():
                     return_menu_rect = pygame.Rect(WINDOW_WIDTH // 2 - 80, WINDOW_HEIGHT - 100, 160, 60)
                     if return_menu_rect.collidepoint(mouse_x, mouse_y):
                         game_state = 'menu'
+                        menu_dirty = True
                         continue
 
-                #zapisanie stanu gry przed ruchem
-                if not picked_cards and difficulty != 'expert':
-                    history.append(serialize_game_board(game_board, picked_cards, picked_from))
-
-               
-                if picked_cards:
-                    #proba polozenia karty na stos docelowy
-                    foundation_start_x = int(WINDOW_WIDTH * 0.1)
-                    for i, pile in enumerate(game_board.foundation_piles):
-                        pile_x = foundation_start_x + i * (CARD_WIDTH + PILE_SPACING)
-                        pile_rect = pygame.Rect(pile_x, int(WINDOW_HEIGHT * 0.05), CARD_WIDTH, CARD_HEIGHT)
-                        if pile_rect.collidepoint(mouse_x, mouse_y):
-                            if can_move_to_foundation(picked_cards[0], pile):
-                                pile.extend(picked_cards)
-                                if picked_from[0] == 'waste':
-                                    pass  
-                                elif picked_from[0] == 'tableau':
-                                    game_board.tableau_piles[picked_from[1]] = game_board.tableau_piles[picked_from[1]][:picked_from[2]]
-                                    if game_board.tableau_piles[picked_from[1]] and not game_board.tableau_piles[picked_from[1]][-1].face_up:
-                                        game_board.tableau_piles[picked_from[1]][-1].face_up = True
-                                picked_cards = []
-                                picked_from = None
-                                break
-
-                    #proba polozenia karty na stos glowny
+                #obsluga przycisku auto-finish - przed podnoszeniem kart, bo przycisk moze zaslaniac
+                #karty stosow glownych, a plan musi widziec cala plansze
+                if autofinish_rect and autofinish_rect.collidepoint(mouse_x, mouse_y):
                     if picked_cards:
-                        total_tableau_width = 7 * (CARD_WIDTH + PILE_SPACING) - PILE_SPACING
-                        tableau_start_x = (WINDOW_WIDTH - total_tableau_width) // 2
-                        for i, pile in enumerate(game_board.tableau_piles):
-                            x = tableau_start_x + i * (CARD_WIDTH + PILE_SPACING)
-                            y = int(WINDOW_HEIGHT * 0.3)
-                            pile_clicked = False
-                            for j, card in enumerate(pile):
-                                card_y = y + j * CARD_SPACING
-                                
-                                #sprawdzenie klikniecia na karte
-                                if j < len(pile) - 1:
-                                    rect = pygame.Rect(x, card_y, CARD_WIDTH, CARD_SPACING)
-                                else:
-                                    rect = pygame.Rect(x, card_y, CARD_WIDTH, CARD_HEIGHT)
-                                if card.face_up and rect.collidepoint(mouse_x, mouse_y):
-                                    if pile:
-                                        top_card = pile[-1]
-                                        if is_opposite_color(picked_cards[0], top_card) and picked_cards[0].value == top_card.value - 1:
-                                            pile.extend(picked_cards)
-                                            if picked_from[0] == 'waste':
-                                                pass  
-                                            elif picked_from[0] == 'tableau':
-                                                game_board.tableau_piles[picked_from[1]] = game_board.tableau_piles[picked_from[1]][:picked_from[2]]
-                                                if game_board.tableau_piles[picked_from[1]] and not game_board.tableau_piles[picked_from[1]][-1].face_up:
-                                                    game_board.tableau_piles[picked_from[1]][-1].face_up = True
-                                            picked_cards = []
-                                            picked_from = None
-                                            pile_clicked = True
-                                            break
-                                    else:
-                                        if picked_cards[0].value == 13:
-                                            pile.extend(picked_cards)
-                                            if picked_from[0] == 'waste':
-                                                pass 
-                                            elif picked_from[0] == 'tableau':
-                                                game_board.tableau_piles[picked_from[1]] = game_board.tableau_piles[picked_from[1]][:picked_from[2]]
-                                                if game_board.tableau_piles[picked_from[1]] and not game_board.tableau_piles[picked_from[1]][-1].face_up:
-                                                    game_board.tableau_piles[picked_from[1]][-1].face_up = True
-                                            picked_cards = []
-                                            picked_from = None
-                                            pile_clicked = True
-                                            break
-                           
-                            #sprawdzenie klikniecia na pusty stos
-                            if not pile and not pile_clicked:
-                                empty_rect = pygame.Rect(x, y, CARD_WIDTH, CARD_HEIGHT)
-                                if empty_rect.collidepoint(mouse_x, mouse_y):
-                                    if picked_cards[0].value == 13:
-                                        pile.extend(picked_cards)
-                                        if picked_from[0] == 'waste':
-                                            pass  
-                                        elif picked_from[0] == 'tableau':
-                                            game_board.tableau_piles[picked_from[1]] = game_board.tableau_piles[picked_from[1]][:picked_from[2]]
-                                            if game_board.tableau_piles[picked_from[1]] and not game_board.tableau_piles[picked_from[1]][-1].face_up:
-                                                game_board.tableau_piles[picked_from[1]][-1].face_up = True
-                                        picked_cards = []
-                                        picked_from = None
-                                        break
-                            if not picked_cards:
-                                break
-
-                    #zwrocenie kart na miejsce startowe
-                    if picked_cards:
-                        if picked_from[0] == 'waste':
-                            picked_cards[0].face_up = True
-                            game_board.waste_pile.append(picked_cards[0])
-                        elif picked_from[0] == 'tableau':
-                            game_board.tableau_piles[picked_from[1]].extend(picked_cards)
-                        elif picked_from[0] == 'foundation':
-                            game_board.foundation_piles[picked_from[1]].extend(picked_cards)
+                        return_picked_cards(game_board, picked_cards, picked_from)
                         picked_cards = []
                         picked_from = None
+                    #caly plan liczony od razu, odtwarzany jako animacja po jednym ruchu
+                    state = KlondikeState.from_serialized(serialize_game_board(game_board, [], None),
+                                                          draw_count=game_board.draw_count)
+                    autofinish_queue.extend(plan_auto_finish(state))
+                    continue
+
+                if picked_cards:
+                    #proba polozenia kart na stosie wskazanym przez indeks planszy
+                    dst = layout.resolve_drop(game_board, picked_cards, mouse_x, mouse_y, picked_from)
+                    if dst is not None:
+                        complete_move(game_board, picked_cards, picked_from, dst, undo_log)
+                    else:
+                        #zwrocenie kart na miejsce startowe
+                        return_picked_cards(game_board, picked_cards, picked_from)
+                    picked_cards = []
+                    picked_from = None
 
                 else:
-                    #obsluga klikniecia na stos dobierania i odrzuconych kart
-                    stock_x = int(WINDOW_WIDTH * 0.8)
-                    stock_y = int(WINDOW_HEIGHT * 0.05)
-                    stock_rect = pygame.Rect(stock_x, stock_y, CARD_WIDTH, CARD_HEIGHT)
-                    waste_x = stock_x - CARD_WIDTH - PILE_SPACING
-                    waste_y = stock_y
-                    waste_rect = pygame.Rect(waste_x, waste_y, CARD_WIDTH, CARD_HEIGHT)
+                    slot = layout.hit_top_row(mouse_x, mouse_y)
 
                     #klikniecie na stos odrzuconych kart
-                    if waste_rect.collidepoint(mouse_x, mouse_y) and game_board.waste_pile:
+                    if slot == ('waste', None) and game_board.waste_pile:
                         picked_cards = [game_board.waste_pile.pop()]
                         picked_from = ('waste', None)
                         continue
                     
                     #klikniecie na stos dobierania
-                    if stock_rect.collidepoint(mouse_x, mouse_y):
-                        waste_x = stock_x - CARD_WIDTH - PILE_SPACING
-                        waste_y = stock_y
-                        waste_rect = pygame.Rect(waste_x, waste_y, CARD_WIDTH, CARD_HEIGHT)
-                        if waste_rect.collidepoint(mouse_x, mouse_y) and game_board.waste_pile:
-                            picked_cards = [game_board.waste_pile.pop()]
-                            picked_from = ('waste', None)
-                            continue
+                    if slot == ('stock', None):
                         if game_board.stock_pile:
-                            card = game_board.stock_pile.pop()
-                            card.face_up = True
-                            game_board.waste_pile.append(card)
-                            picked_cards = []
-                            picked_from = None
+                            count = min(game_board.draw_count, len(game_board.stock_pile))
+                            for _ in range(count):
+                                card = game_board.stock_pile.pop()
+                                card.face_up = True
+                                game_board.waste_pile.append(card)
+                            undo_log.record(('stock', None), ('waste', None), count,
+                                            move=(DRAW, None, None, count))
                         else:
                             #przeniesienie kart ze stosu odrzuconych z powrotem do dobierania
+                            if game_board.waste_pile:
+                                count = len(game_board.waste_pile)
+                                undo_log.record(('waste', None), ('stock', None), count,
+                                                move=(RECYCLE, None, None, count))
                             while game_board.waste_pile:
                                 card = game_board.waste_pile.pop()
                                 card.face_up = False
                                 game_board.stock_pile.append(card)
-                            picked_cards = []
-                            picked_from = None
                         continue
 
                     #obsluga klikniecia na karty w stosach docelowych (tylko w trybie beginner)
-                    if not picked_cards and difficulty == 'beginner':
-                        foundation_start_x = int(WINDOW_WIDTH * 0.1)
-                        for i, pile in enumerate(game_board.foundation_piles):
-                            if pile:
-                                x = foundation_start_x + i * (CARD_WIDTH + PILE_SPACING)
-                                y = int(WINDOW_HEIGHT * 0.05)
-                                rect = pygame.Rect(x, y, CARD_WIDTH, CARD_HEIGHT)
-                                if rect.collidepoint(mouse_x, mouse_y):
-                                    picked_cards = [pile.pop()]
-                                    picked_from = ('foundation', i)
-                                    break
+                    if slot is not None and slot[0] == 'foundation' and difficulty == 'beginner':
+                        pile = game_board.foundation_piles[slot[1]]
+                        if pile:
+                            picked_cards = [pile.pop()]
+                            picked_from = slot
 
                     #obsluga klikniecia na karty w stosach glownych
                     if not picked_cards:
-                        total_tableau_width = 7 * (CARD_WIDTH + PILE_SPACING) - PILE_SPACING
-                        tableau_start_x = (WINDOW_WIDTH - total_tableau_width) // 2
-                        for i, pile in enumerate(game_board.tableau_piles):
-                            x = tableau_start_x + i * (CARD_WIDTH + PILE_SPACING)
-                            y = int(WINDOW_HEIGHT * 0.3)
-                            for j, card in enumerate(pile):
-                                card_y = y + j * CARD_SPACING
-                               
-                                #sprawdzenie klikniecia na karte
-                                if j < len(pile) - 1:
-                                    rect = pygame.Rect(x, card_y, CARD_WIDTH, CARD_SPACING)
-                                else:
-                                    rect = pygame.Rect(x, card_y, CARD_WIDTH, CARD_HEIGHT)
-                                if card.face_up and rect.collidepoint(mouse_x, mouse_y):
-                                    picked_cards = pile[j:]
-                                    picked_from = ('tableau', i, j)
-                                    game_board.tableau_piles[i] = pile[:j]
-                                    break
-                            if picked_cards:
-                                break
+                        hit = layout.hit_tableau(game_board, mouse_x, mouse_y)
+                        if hit is not None and hit[1] is not None:
+                            i, j = hit
+                            pile = game_board.tableau_piles[i]
+                            if pile[j].face_up:
+                                picked_cards = pile[j:]
+                                picked_from = ('tableau', i, j)
+                                game_board.tableau_piles[i] = pile[:j]
 
-                #obsluga przycisku auto-finish
-                if 'autofinish_rect' in locals() and autofinish_rect and autofinish_rect.collidepoint(mouse_x, mouse_y):
-                    moved = True
-                    while moved:
-                        moved = False
-                  
-                        #proba przeniesienia kart ze stosow glownych
-                        for pile in game_board.tableau_piles:
-                            if pile:
-                                card = pile[-1]
-                                for f_pile in game_board.foundation_piles:
-                                    if can_move_to_foundation(card, f_pile):
-                                        f_pile.append(pile.pop())
-                                        moved = True
-                                        break
-             
-                        #proba przeniesienia karty ze stosu odrzuconych
-                        if game_board.waste_pile:
-                            card = game_board.waste_pile[-1]
-                            for f_pile in game_board.foundation_piles:
-                                if can_move_to_foundation(card, f_pile):
-                                    f_pile.append(game_board.waste_pile.pop())
-                                    moved = True
-                                    break
-                    continue
+        profiler.add('events', events_start, time.perf_counter())
 
-        screen.blit(background, (0, 0))
-        game_board.draw(screen)
+        if game_state == 'menu':
+            continue
 
-        newgame_rect = pygame.Rect(20, WINDOW_HEIGHT - 70, 140, 50)
-        pygame.draw.rect(screen, (200, 200, 200), newgame_rect)
-        text = font.render('New Game', True, (0, 0, 0))
-        text_rect = text.get_rect(center=newgame_rect.center)
-        screen.blit(text, text_rect)
-  
-        #wyswietlanie timera
-        if not game_won:
-            timer_font = pygame.font.SysFont(None, 36)
-            elapsed = (pygame.time.get_ticks() - start_ticks) // 1000
-            minutes = elapsed // 60
-            seconds = elapsed % 60
-            timer_text = timer_font.render(f"Time: {minutes:02}:{seconds:02}", True, (255, 255, 255))
-            screen.blit(timer_text, (20, WINDOW_HEIGHT - 140))
-
-        #wyswietlanie poziomu trudnosci
-        if difficulty:
-            diff_label = font.render(f'Level: {difficulty.capitalize()}', True, (255, 255, 255))
-            screen.blit(diff_label, (20, WINDOW_HEIGHT - 110))
-
-        #rysowanie przycisku cofnij ruch
-        if difficulty != 'expert':
-            return_rect = pygame.Rect(WINDOW_WIDTH - 160, 20, 140, 50)
-            pygame.draw.rect(screen, (200, 200, 200), return_rect)
-            text = font.render('Undo', True, (0, 0, 0))
-            text_rect = text.get_rect(center=return_rect.center)
-            screen.blit(text, text_rect)
-     
-        #rysowanie przycisku powrotu do menu
-        if game_state == 'playing':
-            return_menu_rect = pygame.Rect(WINDOW_WIDTH // 2 - 80, WINDOW_HEIGHT - 100, 160, 60)
-            pygame.draw.rect(screen, (180, 180, 180), return_menu_rect)
-            return_menu_text = font.render('Return', True, (0, 0, 0))
-            return_menu_text_rect = return_menu_text.get_rect(center=return_menu_rect.center)
-            screen.blit(return_menu_text, return_menu_text_rect)
-
-        #wyswietlanie przycisku auto-finish
-        show_autofinish = all_tableau_face_up(game_board) and not game_won
+        #animacja auto-finish: karta leci na stos docelowy przez AUTOFINISH_FRAMES klatek,
+        #ruchy stosu dobierania sa wykonywane po jednym na klatke
+        if flight is not None:
+            flight['frame'] += 1
+            if flight['frame'] >= AUTOFINISH_FRAMES:
+                complete_move(game_board, [flight['card']], flight['src'], flight['dst'], undo_log)
+                flight = None
+        elif autofinish_queue:
+            move = autofinish_queue.popleft()
+            if move[0] in (WASTE_TO_FOUNDATION, TABLEAU_TO_FOUNDATION):
+                flight = lift_for_flight(game_board, move)
+            else:
+                apply_engine_move(game_board, move, undo_log)
+
+        #sprawdzanie wygranej
+        prev_game_won = game_won
+        game_won = is_game_won(game_board)
+        if game_won and not prev_game_won and final_time is None:
+            final_time = (pygame.time.get_ticks() - start_ticks) // 1000
+        if game_won != prev_game_won:
+            renderer.invalidate()
+
+        #autozapis po kazdym ruchu i cofnieciu; wygrana gra nie jest juz do wznowienia
+        if game_won and not prev_game_won:
+            delete_game(SAVE_PATH)
+        elif not game_won and len(undo_log.history) != autosaved:
+            autosave(game_board, seed, difficulty, undo_log, pygame.time.get_ticks() - start_ticks)
+            autosaved = len(undo_log.history)
+
+        elapsed = (pygame.time.get_ticks() - start_ticks) // 1000
+        timer_label = f"Time: {elapsed // 60:02}:{elapsed % 60:02}"
+
+        #przycisk auto-finish
+        show_autofinish = (all_tableau_face_up(game_board) and not game_won
+                           and not autofinish_queue and flight is None)
         autofinish_rect = None
         if show_autofinish:
             autofinish_width = 400
@@ -602,64 +1339,55 @@ def main():
             autofinish_x = (WINDOW_WIDTH - autofinish_width) // 2
             autofinish_y = WINDOW_HEIGHT - 230
             autofinish_rect = pygame.Rect(autofinish_x, autofinish_y, autofinish_width, autofinish_height)
-            pygame.draw.rect(screen, (180, 220, 180), autofinish_rect, border_radius=20)
-            big_font = pygame.font.SysFont(None, 60)
-            autofinish_text = big_font.render('AUTO-FINISH', True, (0, 0, 0))
-            autofinish_text_rect = autofinish_text.get_rect(center=autofinish_rect.center)
-            screen.blit(autofinish_text, autofinish_text_rect)
 
-        #rysowanie podnoszonych kart
+        #oznaczenie zmienionych fragmentow ekranu
+        for key, signature, rect in board_regions(game_board):
+            renderer.track(key, signature, rect)
+        renderer.track('timer', None if game_won else timer_label, TIMER_RECT)
+        renderer.track('unverified', game_board.unverified, UNVERIFIED_RECT)
+        renderer.track('autofinish', show_autofinish, autofinish_rect or AUTOFINISH_AREA)
+        if flight is not None:
+            renderer.track('flight', flight_pos(flight), flight['card'].image.get_rect(topleft=flight_pos(flight)))
+        else:
+            renderer.track('flight', None, pygame.Rect(0, 0, 0, 0))
         if picked_cards:
             mx, my = pygame.mouse.get_pos()
-     
-            #podswietlanie mozliwych miejsc docelowych
-            if len(picked_cards) == 1:
-                foundation_start_x = int(WINDOW_WIDTH * 0.1)
-                for i, pile in enumerate(game_board.foundation_piles):
-                    x = foundation_start_x + i * (CARD_WIDTH + PILE_SPACING)
-                    y = int(WINDOW_HEIGHT * 0.05)
-                    pile_rect = pygame.Rect(x, y, CARD_WIDTH, CARD_HEIGHT)
-                    if can_move_to_foundation(picked_cards[0], pile):
-                        pygame.draw.rect(screen, (255, 215, 0), pile_rect, 4) 
-            #rysowanie podnoszonych kart
-            for idx, card in enumerate(picked_cards):
-                card.draw(screen, mx - CARD_WIDTH // 2, my - CARD_HEIGHT // 2 + idx * CARD_SPACING)
-
-        #sprawdzanie wygranej
-        prev_game_won = game_won
-        game_won = is_game_won(game_board)
-
-        if game_won and not prev_game_won and final_time is None:
-            final_time = (pygame.time.get_ticks() - start_ticks) // 1000
-        if game_won:
-            #wyswietlanie ekranu wygranej
-            win_font = pygame.font.SysFont(None, 80)
-            timer_font = pygame.font.SysFont(None, 48)
-            win_text = win_font.render('You Win!', True, (255, 215, 0))
-            if final_time is not None:
-                minutes = final_time // 60
-                seconds = final_time % 60
-                timer_text = timer_font.render(f"Time: {minutes:02}:{seconds:02}", True, (255, 255, 255))
-            else:
-                timer_text = timer_font.render("Time: 00:00", True, (255, 255, 255))
-
-            spacing = 20
-            total_height = win_text.get_height() + spacing + timer_text.get_height()
-            box_width = max(win_text.get_width(), timer_text.get_width()) + 40
-            box_height = total_height + 40
-            box_rect = pygame.Rect(0, 0, box_width, box_height)
-            box_rect.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
-            pygame.draw.rect(screen, (0, 0, 0), box_rect)
-
-            win_text_rect = win_text.get_rect(center=(box_rect.centerx, box_rect.top + 20 + win_text.get_height() // 2))
-            screen.blit(win_text, win_text_rect)
+            drag_rect = pygame.Rect(mx - CARD_WIDTH // 2, my - CARD_HEIGHT // 2,
+                                    CARD_WIDTH, CARD_HEIGHT + (len(picked_cards) - 1) * CARD_SPACING)
+            renderer.track('drag', (mx, my, tuple(id(card) for card in picked_cards)), drag_rect)
+            renderer.track('highlight', tuple(foundation_highlights(game_board, picked_cards)), FOUNDATION_AREA)
+        else:
+            renderer.track('drag', None, pygame.Rect(0, 0, 0, 0))
+            renderer.track('highlight', (), FOUNDATION_AREA)
+        if hint:
+            renderer.track('hint', tuple(tuple(rect) for rect in hint), hint[0].unionall(hint[1:]))
+        else:
+            renderer.track('hint', (), pygame.Rect(0, 0, 0, 0))
 
-            timer_text_rect = timer_text.get_rect(center=(box_rect.centerx, win_text_rect.bottom + spacing + timer_text.get_height() // 2))
-            screen.blit(timer_text, timer_text_rect)
+        renderer.track('profiler', profiler.overlay_lines if show_profile else None, PROFILE_RECT)
 
-        pygame.display.flip()
-        clock.tick(FPS)
+        renderer.render(draw_scene)
+        profiler.end_frame()
+        #bez przeciagania i animacji petla budzi sie na zdarzenie albo na zmiane sekundy timera
+        active = bool(picked_cards) or flight is not None or bool(autofinish_queue) or not running
+        timeout = IDLE_TIMEOUT if game_won else 1000 - (pygame.time.get_ticks() - start_ticks) % 1000
+        waited = wait_for_frame(active, timeout)
 
+    #nieskonczona gra zostaje w pliku zapisu (jej powtorka bedzie zapisana po zakonczeniu),
+    #karty w rece albo w locie wracaja najpierw na plansze
+    if flight is not None:
+        complete_move(game_board, [flight['card']], flight['src'], flight['dst'], undo_log)
+    if picked_cards:
+        return_picked_cards(game_board, picked_cards, picked_from)
+    game_won = game_won or is_game_won(game_board)
+    if undo_log.history and not game_won:
+        autosave(game_board, seed, difficulty, undo_log, pygame.time.get_ticks() - start_ticks)
+    else:
+        save_replay(seed, difficulty, undo_log, game_won, game_board)
+    if profiler.enabled:
+        profiler.export_chrome_trace(TRACE_PATH)
+        print(', '.join(f"{name}: {seconds * 1000:.0f} ms" for name, seconds in profiler.marks.items()),
+              file=sys.stderr)
     pygame.quit()
     sys.exit()
 
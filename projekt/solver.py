@@ -0,0 +1,235 @@
+#solver pasjansa - przeszukiwanie w glab z tablica transpozycji i limitem wezlow/czasu
+#wynik: 'solvable' (z lista ruchow), 'unsolvable' albo 'unknown' gdy skonczyl sie budzet
+import random
+import sys
+import time
+from collections import namedtuple
+
+from klondike import (KlondikeState, RANK, RED, DRAW, RECYCLE, WASTE_TO_FOUNDATION,
+                      WASTE_TO_TABLEAU, TABLEAU_TO_FOUNDATION, TABLEAU_TO_TABLEAU,
+                      FOUNDATION_TO_TABLEAU, TABLEAU_COUNT, shuffled_order)
+
+SolveResult = namedtuple('SolveResult', 'status moves nodes')
+
+MAX_DEPTH = 52  #maksymalna glebokosc karty w stosie glownym (wieksza niz mozliwa w Klondike)
+MAX_RESERVE = 104  #maksymalna liczba kart w stosie dobierania lub odrzuconych (dwie talie)
+
+#losowe 64-bitowe klucze Zobrista, stale ziarno = te same hashe przy kazdym uruchomieniu
+_rng = random.Random(0x5EED)
+#karta na pozycji w stosie glownym: [stos][glebokosc][karta * 2 + odkryta]
+Z_TABLEAU = [[[_rng.getrandbits(64) for _ in range(104)] for _ in range(MAX_DEPTH)]
+             for _ in range(TABLEAU_COUNT[2])]
+Z_STOCK = [[_rng.getrandbits(64) for _ in range(52)] for _ in range(MAX_RESERVE)]
+Z_WASTE = [[_rng.getrandbits(64) for _ in range(52)] for _ in range(MAX_RESERVE)]
+#liczba kart na danym stosie docelowym
+Z_FOUNDATION = [[_rng.getrandbits(64) for _ in range(14)] for _ in range(8)]
+del _rng
+
+#stosy docelowe kolorow przeciwnych do czerwonego/czarnego, klucz: (czerwona, liczba stosow docelowych)
+OPPOSITE_FOUNDATIONS = {
+    (red, count): tuple(f for f in range(count) if (f % 4 < 2) != red)
+    for red in (False, True) for count in (4, 8)
+}
+
+
+def zobrist(state):
+    #pelny hash stanu, w trakcie przeszukiwania liczony przyrostowo przez zobrist_delta
+    h = 0
+    for i, pile in enumerate(state.tableau):
+        hidden = state.hidden[i]
+        z = Z_TABLEAU[i]
+        for k, card in enumerate(pile):
+            h ^= z[k][card * 2 + (k >= hidden)]
+    for k, card in enumerate(state.stock):
+        h ^= Z_STOCK[k][card]
+    for k, card in enumerate(state.waste):
+        h ^= Z_WASTE[k][card]
+    for f, count in enumerate(state.foundations):
+        h ^= Z_FOUNDATION[f][count]
+    return h
+
+def _flip_delta(state, src, remaining):
+    #zmiana hasha, gdy po ruchu karta na wierzchu stosu src zostanie odkryta
+    hidden = state.hidden[src]
+    if hidden and hidden == remaining:
+        card = state.tableau[src][remaining - 1]
+        z = Z_TABLEAU[src][remaining - 1]
+        return z[card * 2] ^ z[card * 2 + 1]
+    return 0
+
+def zobrist_delta(state, move):
+    #roznica hasha po wykonaniu ruchu - liczona przed state.apply(move)
+    kind, src, dst, count = move
+    if kind == DRAW:
+        stock, waste = state.stock, state.waste
+        top = len(stock) - 1
+        if count == 1:
+            card = stock[top]
+            return Z_STOCK[top][card] ^ Z_WASTE[len(waste)][card]
+        #przy dobieraniu po kilka kart ich kolejnosc sie odwraca
+        d = 0
+        base = len(waste)
+        for k in range(count):
+            card = stock[top - k]
+            d ^= Z_STOCK[top - k][card] ^ Z_WASTE[base + k][card]
+        return d
+    if kind == RECYCLE:
+        d = 0
+        waste = state.waste
+        n = len(waste)
+        for k, card in enumerate(waste):
+            d ^= Z_WASTE[k][card] ^ Z_STOCK[n - 1 - k][card]
+        return d
+    if kind == WASTE_TO_FOUNDATION:
+        waste = state.waste
+        count = state.foundations[dst]
+        return Z_WASTE[len(waste) - 1][waste[-1]] ^ Z_FOUNDATION[dst][count] ^ Z_FOUNDATION[dst][count + 1]
+    if kind == WASTE_TO_TABLEAU:
+        waste = state.waste
+        card = waste[-1]
+        return Z_WASTE[len(waste) - 1][card] ^ Z_TABLEAU[dst][len(state.tableau[dst])][card * 2 + 1]
+    if kind == FOUNDATION_TO_TABLEAU:
+        count = state.foundations[src]
+        card = src % 4 * 13 + count - 1
+        return (Z_FOUNDATION[src][count] ^ Z_FOUNDATION[src][count - 1] ^
+                Z_TABLEAU[dst][len(state.tableau[dst])][card * 2 + 1])
+    pile = state.tableau[src]
+    size = len(pile)
+    if kind == TABLEAU_TO_FOUNDATION:
+        f = state.foundations[dst]
+        d = Z_TABLEAU[src][size - 1][pile[-1] * 2 + 1] ^ Z_FOUNDATION[dst][f] ^ Z_FOUNDATION[dst][f + 1]
+        return d ^ _flip_delta(state, src, size - 1)
+    #przenoszone karty sa zawsze odkryte
+    d = 0
+    base = len(state.tableau[dst]) - (size - count)
+    z_src = Z_TABLEAU[src]
+    z_dst = Z_TABLEAU[dst]
+    for k in range(size - count, size):
+        card = pile[k] * 2 + 1
+        d ^= z_src[k][card] ^ z_dst[base + k][card]
+    return d ^ _flip_delta(state, src, size - count)
+
+
+class TranspositionTable:
+    #ograniczony zbior odwiedzonych stanow, po przepelnieniu usuwane sa najstarsze wpisy
+    def __init__(self, max_entries=1_000_000):
+        self.max_entries = max_entries
+        self.entries = {}
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, key):
+        entries = self.entries
+        if len(entries) >= self.max_entries:
+            del entries[next(iter(entries))]
+            self.evictions += 1
+        entries[key] = None
+
+
+def is_safe_foundation_move(state, card):
+    #karte mozna bezpiecznie odlozyc, gdy zadna karta o jeden nizsza w przeciwnym kolorze
+    #nie bedzie juz jej potrzebowac w stosach glownych
+    rank = RANK[card]
+    if rank <= 2:
+        return True
+    foundations = state.foundations
+    return all(foundations[f] >= rank - 1 for f in OPPOSITE_FOUNDATIONS[RED[card], len(foundations)])
+
+def ordered_moves(state):
+    #kolejnosc przeszukiwania: na stos docelowy, odkrywajace zakryte karty, z odrzuconych,
+    #pozostale przesuniecia, dobieranie; lista jest zdejmowana od konca
+    foundation = []
+    revealing = []
+    from_waste = []
+    other = []
+    stock = []
+    for move in state.legal_moves():
+        kind, src, dst, count = move
+        if kind == WASTE_TO_FOUNDATION or kind == TABLEAU_TO_FOUNDATION:
+            card = state.waste[-1] if kind == WASTE_TO_FOUNDATION else state.tableau[src][-1]
+            if is_safe_foundation_move(state, card):
+                #bezpieczny ruch nie wymaga rozgalezienia
+                return [move]
+            foundation.append(move)
+        elif kind == TABLEAU_TO_TABLEAU:
+            if len(state.tableau[src]) - count == state.hidden[src] and state.hidden[src]:
+                revealing.append(move)
+            else:
+                other.append(move)
+        elif kind == WASTE_TO_TABLEAU:
+            from_waste.append(move)
+        elif kind == FOUNDATION_TO_TABLEAU:
+            other.append(move)
+        else:
+            stock.append(move)
+    moves = stock
+    moves += other
+    moves += from_waste
+    moves += revealing
+    moves += foundation
+    return moves
+
+
+def solve(state, max_nodes=200_000, time_limit=None, table=None):
+    #przeszukiwanie w glab bez rekurencji; state jest modyfikowany, ale na koncu wraca do stanu poczatkowego
+    if table is None:
+        table = TranspositionTable()
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    h = zobrist(state)
+    table.add(h)
+    if state.is_won():
+        return SolveResult('solvable', [], 0)
+
+    nodes = 0
+    path = []
+    stack = [ordered_moves(state)]
+    status = 'unsolvable'
+    while stack:
+        moves = stack[-1]
+        if not moves:
+            stack.pop()
+            if path:
+                move, h = path.pop()
+                state.undo(move)
+            continue
+        if nodes >= max_nodes or (deadline is not None and nodes & 255 == 0 and time.perf_counter() > deadline):
+            status = 'unknown'
+            break
+        move = moves.pop()
+        new_h = h ^ zobrist_delta(state, move)
+        if new_h in table:
+            continue
+        table.add(new_h)
+        nodes += 1
+        state.apply(move)
+        path.append((move, h))
+        h = new_h
+        if state.is_won():
+            status = 'solvable'
+            break
+        stack.append(ordered_moves(state))
+
+    solution = [move for move, _ in path] if status == 'solvable' else []
+    #przywrocenie stanu poczatkowego
+    while path:
+        state.undo(path.pop()[0])
+    return SolveResult(status, solution, nodes)
+
+
+def solve_order(order, **kwargs):
+    #rozwiazanie rozdania podanego jako kolejnosc kart w talii (jak Deck.cards)
+    return solve(KlondikeState.deal(order), **kwargs)
+
+
+if __name__ == "__main__":
+    seeds = range(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
+    for seed in seeds:
+        start = time.perf_counter()
+        result = solve_order(shuffled_order(seed), max_nodes=200_000, time_limit=0.5)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"seed {seed}: {result.status}, {len(result.moves)} moves, {result.nodes} nodes, {elapsed:.0f} ms")
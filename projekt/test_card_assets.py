@@ -0,0 +1,24 @@
+#obrazy kart: pamiec podreczna w assets/cache jest opcjonalna
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import card_assets
+
+SIZE = (20, 28)
+
+
+def test_unwritable_cache(tmp_path, monkeypatch):
+    #katalog pamieci podrecznej "wewnatrz" zwyklego pliku - kazdy zapis konczy sie OSError
+    blocker = tmp_path / 'cache'
+    blocker.write_bytes(b'')
+    monkeypatch.setattr(card_assets, 'CACHE_DIR', str(blocker / 'cards'))
+    atlas = card_assets.prepare_atlas(SIZE)
+    assert atlas.get_size() == (SIZE[0], SIZE[1] * len(card_assets.ATLAS_ORDER))
+
+def test_cache_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(card_assets, 'CACHE_DIR', str(tmp_path))
+    atlas = card_assets.prepare_atlas(SIZE)
+    assert os.path.exists(card_assets.cache_path(SIZE))
+    cached = card_assets.read_atlas(SIZE)
+    assert card_assets.pygame.image.tobytes(cached, 'RGBA') == card_assets.pygame.image.tobytes(atlas, 'RGBA')
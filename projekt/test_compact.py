@@ -0,0 +1,47 @@
+#zwarta plansza: pack/unpack i konwersje do stanu silnika nie gubia zadnej karty
+import random
+
+import pytest
+
+from compact import CompactBoard, pack_state, unpack_state
+from klondike import KlondikeState, shuffled_order, TABLEAU_COUNT
+
+
+def played_states(decks, draw_count, seed):
+    #stany z losowej gry, po jednym na kazdy ruch
+    state = KlondikeState.deal(shuffled_order(seed, decks), draw_count=draw_count)
+    rng = random.Random(seed)
+    for _ in range(150):
+        yield state
+        moves = state.legal_moves()
+        if not moves:
+            break
+        state.apply(rng.choice(moves))
+
+def same_state(a, b):
+    return (a.tableau, a.hidden, a.foundations, a.stock, a.waste) == (b.tableau, b.hidden, b.foundations,
+                                                                     b.stock, b.waste)
+
+@pytest.mark.parametrize('decks, draw_count', [(1, 1), (1, 3), (2, 1), (2, 3)])
+def test_pack_unpack_round_trip(decks, draw_count):
+    for seed in range(10):
+        for state in played_states(decks, draw_count, seed):
+            data = pack_state(state)
+            restored = unpack_state(data, draw_count=draw_count, decks=decks)
+            assert same_state(restored, state)
+            assert pack_state(restored) == data
+            if decks == 1:
+                assert len(data) <= 65
+
+def test_from_bytes_round_trip():
+    for state in played_states(2, 1, 5):
+        board = CompactBoard.from_state(state)
+        copy = CompactBoard.from_bytes(board.key(), TABLEAU_COUNT[2], 8)
+        assert copy == board and hash(copy) == hash(board)
+        assert copy.copy() == board
+
+def test_serialized_round_trip():
+    for decks in (1, 2):
+        for state in played_states(decks, 1, 6):
+            serialized = CompactBoard.from_state(state).to_serialized()
+            assert same_state(KlondikeState.from_serialized(serialized), state)
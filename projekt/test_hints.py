@@ -0,0 +1,59 @@
+#generator podpowiedzi: zapamietane cele stosow po apply/undo i po ruchach GUI daja te same ruchy
+#co KlondikeState.legal_moves liczone od nowa
+import random
+
+import pytest
+
+import solitaire
+from hints import MoveGenerator, find_hint, search_hint
+from klondike import KlondikeState, shuffled_order
+from test_replay import display, drag, lone_king_game  #display - okno pygame dla calego modulu (autouse)
+
+
+@pytest.mark.parametrize('decks, draw_count', [(1, 1), (1, 3), (2, 1), (2, 3)])
+def test_generator_matches_engine(decks, draw_count):
+    rng = random.Random(decks * 10 + draw_count)
+    for seed in range(20):
+        state = KlondikeState.deal(shuffled_order(seed, decks), seed % 2 == 0, draw_count)
+        generator = MoveGenerator(state)
+        played = []
+        for _ in range(200):
+            fresh = state.copy().legal_moves()
+            assert sorted(generator.legal_moves(), key=repr) == sorted(fresh, key=repr)
+            if played and rng.random() < 0.2:
+                generator.undo(played.pop())
+                continue
+            if not fresh:
+                break
+            move = rng.choice(fresh)
+            generator.apply(move)
+            played.append(move)
+
+def test_search_hint_keeps_state():
+    state = KlondikeState.deal(shuffled_order(7))
+    generator = MoveGenerator(state.copy())
+    hint = search_hint(generator)
+    assert hint == find_hint(state)
+    assert hint in state.legal_moves()
+    assert sorted(generator.legal_moves(), key=repr) == sorted(state.legal_moves(), key=repr)
+
+def test_hint_generator_follows_gui_moves():
+    #generator podpowiedzi zyjacy w dzienniku ruchow po przeciagnieciach i cofnieciach (takze ruchow
+    #sprzed jego zbudowania) daje te same ruchy co stan zbudowany od nowa z planszy
+    seed, game_board, undo_log, _, _ = lone_king_game()
+    rng = random.Random(seed)
+    for _ in range(300):
+        if undo_log.hints is None:
+            solitaire.compute_hint(game_board, undo_log, 'medium')
+        if len(undo_log) and rng.random() < 0.3:
+            undo_log.undo(game_board)
+        else:
+            sources = [('tableau', i, j) for i, pile in enumerate(game_board.tableau_piles)
+                       for j, card in enumerate(pile) if card.face_up]
+            targets = ([('tableau', i) for i in range(len(game_board.tableau_piles))]
+                       + [('foundation', i) for i in range(len(game_board.foundation_piles))])
+            if sources:
+                drag(game_board, undo_log, rng.choice(sources), rng.choice(targets))
+        if undo_log.hints is not None:
+            fresh = KlondikeState.from_serialized(solitaire.serialize_game_board(game_board, [], None))
+            assert sorted(undo_log.hints.legal_moves(), key=repr) == sorted(fresh.legal_moves(), key=repr)
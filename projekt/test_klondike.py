@@ -0,0 +1,56 @@
+#silnik regul: apply/undo wracaja dokladnie do stanu sprzed ruchu, w kazdym wariancie gry
+import random
+
+import pytest
+
+from klondike import KlondikeState, shuffled_order, plan_auto_finish, TABLEAU_COUNT
+
+
+def snapshot(state):
+    return ([pile[:] for pile in state.tableau], state.hidden[:], state.foundations[:],
+            state.stock[:], state.waste[:])
+
+@pytest.mark.parametrize('decks, draw_count, foundation_to_tableau',
+                         [(1, 1, False), (1, 3, False), (1, 1, True), (2, 1, False), (2, 3, True)])
+def test_apply_undo_round_trip(decks, draw_count, foundation_to_tableau):
+    rng = random.Random(decks * 10 + draw_count)
+    for seed in range(20):
+        state = KlondikeState.deal(shuffled_order(seed, decks), foundation_to_tableau, draw_count)
+        start = snapshot(state)
+        played = []
+        snapshots = []
+        for _ in range(300):
+            moves = state.legal_moves()
+            if not moves:
+                break
+            #kazdy dozwolony ruch zastosowany i cofniety nie zmienia stanu
+            before = snapshot(state)
+            for move in moves:
+                state.apply(move)
+                state.undo(move)
+                assert snapshot(state) == before, move
+            move = rng.choice(moves)
+            snapshots.append(before)
+            state.apply(move)
+            played.append(move)
+        #cofniecie calej gry ruch po ruchu
+        while played:
+            state.undo(played.pop())
+            assert snapshot(state) == snapshots.pop()
+        assert snapshot(state) == start
+
+def test_deal():
+    for decks in (1, 2):
+        state = KlondikeState.deal(shuffled_order(3, decks))
+        count = TABLEAU_COUNT[decks]
+        assert [len(pile) for pile in state.tableau] == list(range(1, count + 1))
+        assert state.hidden == list(range(count))
+        cards = [card for pile in state.tableau for card in pile] + state.stock
+        assert sorted(cards) == sorted(list(range(52)) * decks)
+
+def test_auto_finish_wins_open_game():
+    #wszystkie karty odkryte w stosie dobierania - plan musi dojsc do wygranej
+    state = KlondikeState([[] for _ in range(7)], [0] * 7, [0] * 4, shuffled_order(4), [])
+    for move in plan_auto_finish(state):
+        state.apply(move)
+    assert state.is_won()
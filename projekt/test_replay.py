@@ -0,0 +1,86 @@
+#zgodnosc ruchow zapisywanych przez GUI z silnikiem: kazda powtorka nagrana przez gracza
+#musi przejsc run_replay(check=True); uruchamianie: python -m pytest (bez okna, SDL_VIDEODRIVER=dummy)
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import random
+
+import pytest
+
+import solitaire
+from klondike import KlondikeState, shuffled_order, DRAW, RECYCLE
+from replay import Replay, run_replay, variant_flags
+
+
+@pytest.fixture(scope='module', autouse=True)
+def display():
+    solitaire.init_display()
+    yield
+    solitaire.pygame.quit()
+
+def pile_center(game_board, key):
+    #punkt, w ktorym gracz upuszcza karty na stos
+    if key[0] == 'tableau':
+        x, y = solitaire.layout.tableau_pos(key[1], max(len(game_board.tableau_piles[key[1]]) - 1, 0))
+        return x + solitaire.CARD_WIDTH // 2, y + solitaire.CARD_HEIGHT // 2
+    return solitaire.layout.slot_rect(key).center
+
+def drag(game_board, undo_log, picked_from, dst):
+    #podniesienie i upuszczenie kart tak jak w main(); zwraca stos docelowy albo None
+    pile = game_board.tableau_piles[picked_from[1]]
+    picked_cards = pile[picked_from[2]:]
+    game_board.tableau_piles[picked_from[1]] = pile[:picked_from[2]]
+    x, y = pile_center(game_board, dst)
+    target = solitaire.layout.resolve_drop(game_board, picked_cards, x, y, picked_from)
+    if target is not None:
+        solitaire.complete_move(game_board, picked_cards, picked_from, target, undo_log)
+    else:
+        solitaire.return_picked_cards(game_board, picked_cards, picked_from)
+    return target
+
+def lone_king_game():
+    #losowa gra na silniku (odtwarzana na planszy GUI) az do stanu z samotnym krolem na jednym
+    #stosie glownym i pustym innym stosem
+    for seed in range(500):
+        state = KlondikeState.deal(shuffled_order(seed))
+        game_board, _ = solitaire.deal_new_game(seed=seed)
+        undo_log = solitaire.UndoLog()
+        rng = random.Random(seed)
+        for _ in range(400):
+            piles = game_board.tableau_piles
+            kings = [i for i, pile in enumerate(piles) if len(pile) == 1 and pile[0].value == 13]
+            empty = [i for i, pile in enumerate(piles) if not pile]
+            if kings and empty:
+                return seed, game_board, undo_log, kings[0], empty[0]
+            legal = state.legal_moves()
+            moves = [move for move in legal if move[0] not in (DRAW, RECYCLE)] or legal
+            if not moves:
+                break
+            move = rng.choice(moves)
+            state.apply(move)
+            solitaire.apply_engine_move(game_board, move, undo_log)
+    raise AssertionError("no deal with a lone king and an empty pile")
+
+
+def test_lone_king_to_empty_pile_is_not_a_move():
+    seed, game_board, undo_log, king, empty = lone_king_game()
+    recorded = len(undo_log.history)
+    assert drag(game_board, undo_log, ('tableau', king, 0), ('tableau', empty)) is None
+    assert len(undo_log.history) == recorded
+    assert len(game_board.tableau_piles[king]) == 1
+
+def test_gui_drops_pass_replay_check():
+    #wszystkie przeciagniecia, na ktore pozwala GUI, zapisane jako powtorka i sprawdzone silnikiem
+    seed, game_board, undo_log, _, _ = lone_king_game()
+    rng = random.Random(seed)
+    for _ in range(200):
+        sources = [('tableau', i, j) for i, pile in enumerate(game_board.tableau_piles)
+                   for j, card in enumerate(pile) if card.face_up]
+        targets = ([('tableau', i) for i in range(len(game_board.tableau_piles))]
+                   + [('foundation', i) for i in range(len(game_board.foundation_piles))])
+        if not sources:
+            break
+        drag(game_board, undo_log, rng.choice(sources), rng.choice(targets))
+    run_replay(Replay(seed, variant_flags(1, 1), undo_log.history), check=True)
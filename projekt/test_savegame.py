@@ -0,0 +1,74 @@
+#zapis przerwanej gry: kodowanie i odczyt, uszkodzone pliki zawsze koncza sie SaveError
+import random
+
+import pytest
+
+from compact import CompactBoard
+from klondike import KlondikeState, shuffled_order, TABLEAU_TO_TABLEAU
+from replay import UNDO
+from savegame import HEADER, SaveError, SavedGame, decode_game, encode_game
+
+
+def played_game(seed, decks=1, draw_count=1, moves=80):
+    #zapis gry po kilkudziesieciu losowych ruchach (z cofnieciami w przebiegu)
+    state = KlondikeState.deal(shuffled_order(seed, decks), draw_count=draw_count)
+    rng = random.Random(seed)
+    history = []
+    played = []
+    for _ in range(moves):
+        if played and rng.random() < 0.1:
+            state.undo(played.pop())
+            history.append(UNDO)
+            continue
+        legal = state.legal_moves()
+        if not legal:
+            break
+        move = rng.choice(legal)
+        state.apply(move)
+        played.append(move)
+        history.append(move)
+    return SavedGame(CompactBoard.from_state(state), 'medium', draw_count, decks, 61_000, seed, history)
+
+
+@pytest.mark.parametrize('decks, draw_count', [(1, 1), (1, 3), (2, 1), (2, 3)])
+def test_round_trip(decks, draw_count):
+    for seed in range(10):
+        saved = played_game(seed, decks, draw_count)
+        assert decode_game(bytes(encode_game(saved))) == saved
+
+def test_card_out_of_range():
+    data = bytearray(encode_game(played_game(1)))
+    data[HEADER.size + 1] = 200  #pierwsza karta pierwszego stosu glownego
+    with pytest.raises(SaveError):
+        decode_game(bytes(data))
+
+def test_missing_card():
+    saved = played_game(2)
+    board = saved.board.copy()
+    pile = max(board.tableau, key=len)
+    del pile[-1]
+    with pytest.raises(SaveError):
+        decode_game(bytes(encode_game(saved._replace(board=board))))
+
+def test_truncated():
+    data = bytes(encode_game(played_game(3)))
+    for size in (0, HEADER.size - 1, HEADER.size + 5, len(data) - 1):
+        with pytest.raises(SaveError):
+            decode_game(data[:size])
+
+def test_bad_move():
+    saved = played_game(4)
+    with pytest.raises(SaveError):
+        decode_game(bytes(encode_game(saved._replace(history=[(TABLEAU_TO_TABLEAU, 9, 0, 1)]))))
+
+def test_random_corruption():
+    #pojedynczy zmieniony bajt: albo poprawny zapis, albo SaveError - nigdy inny wyjatek
+    data = bytes(encode_game(played_game(5)))
+    rng = random.Random(5)
+    for _ in range(2000):
+        corrupt = bytearray(data)
+        corrupt[rng.randrange(len(corrupt))] = rng.randrange(256)
+        try:
+            decode_game(bytes(corrupt))
+        except SaveError:
+            pass
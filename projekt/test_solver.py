@@ -0,0 +1,55 @@
+#solver: wynik na znanych rozdaniach i zgodnosc przyrostowego hasha Zobrista z pelnym
+import random
+
+import pytest
+
+from klondike import KlondikeState, shuffled_order
+from solver import solve, solve_order, zobrist, zobrist_delta
+
+SOLVABLE_SEED = 0
+UNSOLVABLE_SEED = 38  #przeszukiwanie konczy sie po ok. 85 tys. wezlow
+
+
+def test_solvable_seed():
+    state = KlondikeState.deal(shuffled_order(SOLVABLE_SEED))
+    result = solve(state)
+    assert result.status == 'solvable'
+    #solver przywraca stan, a znalezione ruchy sa dozwolone i koncza gre wygrana
+    for move in result.moves:
+        assert move in state.legal_moves()
+        state.apply(move)
+    assert state.is_won()
+
+def test_unsolvable_seed():
+    result = solve_order(shuffled_order(UNSOLVABLE_SEED))
+    assert result.status == 'unsolvable' and result.moves == []
+
+def test_budget_gives_unknown():
+    assert solve_order(shuffled_order(UNSOLVABLE_SEED), max_nodes=1000).status == 'unknown'
+
+def test_blocked_game_is_unsolvable():
+    #dwojka pik lezy na asie pik, a wszystkie czerwone trojki sa juz na stosach docelowych
+    spades = [39 + value for value in range(13)]
+    tableau = [[spades[0], spades[1]]] + [[] for _ in range(6)]
+    state = KlondikeState(tableau, [1] + [0] * 6, [13, 13, 13, 0], spades[2:], [])
+    assert solve(state).status == 'unsolvable'
+
+@pytest.mark.parametrize('decks, draw_count', [(1, 1), (1, 3), (2, 1), (2, 3)])
+def test_zobrist_delta_matches_full_hash(decks, draw_count):
+    rng = random.Random(decks * 10 + draw_count)
+    for seed in range(10):
+        state = KlondikeState.deal(shuffled_order(seed, decks), seed % 2 == 0, draw_count)
+        h = zobrist(state)
+        for _ in range(200):
+            moves = state.legal_moves()
+            if not moves:
+                break
+            for move in moves:
+                delta = zobrist_delta(state, move)
+                state.apply(move)
+                assert zobrist(state) == h ^ delta, move
+                state.undo(move)
+            move = rng.choice(moves)
+            h ^= zobrist_delta(state, move)
+            state.apply(move)
+        assert zobrist(state) == h